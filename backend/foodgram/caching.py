@@ -0,0 +1,182 @@
+import hashlib
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, Max
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+from rest_framework.renderers import JSONRenderer
+
+
+def get_version_key(model):
+    return f'table-version:{model._meta.label_lower}'
+
+
+# Версии, выданные этим процессом, и состояние таблицы на тот момент
+local_versions = {}
+
+
+def get_new_version():
+    return uuid.uuid4().hex, int(time.time())
+
+
+def get_table_fingerprint(model):
+    return tuple(model.objects.aggregate(
+        count=Count('pk'), last_id=Max('pk'),
+    ).values())
+
+
+def get_table_version(model):
+    key = get_version_key(model)
+    version = cache.get(key)
+    if version is not None:
+        return version
+    if settings.CACHE_IS_SHARED:
+        cache.add(key, get_new_version(), timeout=None)
+        return cache.get(key)
+    # Версия в памяти процесса истекает, чтобы заметить изменения из других
+    # процессов. Если число строк и последний id не изменились, прежняя
+    # версия сохраняется и индексы не перестраиваются
+    label = model._meta.label_lower
+    fingerprint = get_table_fingerprint(model)
+    previous = local_versions.get(label)
+    if previous is not None and previous[0] == fingerprint:
+        version = previous[1]
+    else:
+        version = get_new_version()
+    cache.add(key, version, timeout=settings.TABLE_VERSION_TIMEOUT)
+    version = cache.get(key)
+    if version is not None:
+        local_versions[label] = (fingerprint, version)
+    return version
+
+
+def bump_table_version(model):
+    local_versions.pop(model._meta.label_lower, None)
+    cache.set(
+        get_version_key(model), get_new_version(),
+        timeout=settings.TABLE_VERSION_TIMEOUT,
+    )
+
+
+class LocalCache:
+    def __init__(self, size_setting, ttl_setting=None):
+        self.size_setting = size_setting
+        self.ttl_setting = ttl_setting
+        self.lock = threading.Lock()
+        self.items = OrderedDict()
+
+    def get(self, key):
+        with self.lock:
+            item = self.items.get(key)
+            if item is None:
+                return None
+            expires, value = item
+            if expires is not None and expires < time.monotonic():
+                del self.items[key]
+                return None
+            self.items.move_to_end(key)
+        return value
+
+    def set(self, key, value):
+        expires = None
+        if self.ttl_setting is not None:
+            expires = time.monotonic() + getattr(settings, self.ttl_setting)
+        with self.lock:
+            self.items[key] = (expires, value)
+            self.items.move_to_end(key)
+            while len(self.items) > getattr(settings, self.size_setting):
+                self.items.popitem(last=False)
+
+    def delete(self, key):
+        with self.lock:
+            self.items.pop(key, None)
+
+
+local_responses = LocalCache('RESPONSE_CACHE_LOCAL_SIZE')
+
+
+def get_response_key(version, request):
+    return hashlib.sha1(
+        f'{version}:{request.get_full_path()}'.encode()
+    ).hexdigest()
+
+
+def make_cached_response(content, key, modified):
+    response = HttpResponse(content, content_type='application/json')
+    response['ETag'] = quote_etag(key)
+    response['Last-Modified'] = http_date(modified)
+    response['Cache-Control'] = 'no-cache'
+    return response
+
+
+def accepts_json(request):
+    return (
+        'format' not in request.GET
+        and 'text/html' not in request.headers.get('Accept', '')
+    )
+
+
+async def aget_cached_response(request, model):
+    version = await cache.aget(get_version_key(model))
+    if version is None:
+        return None
+    version, modified = version
+    key = get_response_key(version, request)
+    not_modified = get_conditional_response(
+        request, etag=quote_etag(key), last_modified=modified,
+    )
+    if not_modified is not None:
+        return not_modified
+    content = local_responses.get(key)
+    if content is None:
+        content = await cache.aget(f'response:{key}')
+    if content is None:
+        return None
+    local_responses.set(key, content)
+    return make_cached_response(content, key, modified)
+
+
+class TableCacheMixin:
+    def cached_response(self, request, build_response):
+        if not isinstance(request.accepted_renderer, JSONRenderer):
+            return build_response()
+        version, modified = get_table_version(self.queryset.model)
+        key = get_response_key(version, request)
+        not_modified = get_conditional_response(
+            request, etag=quote_etag(key), last_modified=modified,
+        )
+        if not_modified is not None:
+            return not_modified
+        content = local_responses.get(key)
+        if content is None:
+            content = cache.get(f'response:{key}')
+        if content is None:
+            response = build_response()
+            if response.status_code != 200:
+                return response
+            content = JSONRenderer().render(response.data)
+            cache.set(
+                f'response:{key}', content, settings.RESPONSE_CACHE_TIMEOUT,
+            )
+        local_responses.set(key, content)
+        return make_cached_response(content, key, modified)
+
+    def list(self, request, *args, **kwargs):
+        return self.cached_response(
+            request, lambda: super(TableCacheMixin, self).list(
+                request, *args, **kwargs
+            ),
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.cached_response(
+            request, lambda: super(TableCacheMixin, self).retrieve(
+                request, *args, **kwargs
+            ),
+        )
@@ -0,0 +1,74 @@
+import threading
+from collections import defaultdict
+
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseForbidden
+
+METRICS = (
+    ('requests_total', 'counter', 'Number of requests'),
+    ('db_queries_total', 'counter', 'Number of SQL queries'),
+    ('db_duplicate_queries_total', 'counter',
+     'SQL queries repeating a statement already run in the same request'),
+    ('db_seconds_total', 'counter', 'Time spent in SQL queries'),
+    ('view_seconds_total', 'counter',
+     'Time spent in views, including serialization and its SQL queries'),
+    ('renderer_seconds_total', 'counter',
+     'Time spent in response renderers after the view returned'),
+    ('duration_seconds_total', 'counter', 'Total request processing time'),
+    ('response_bytes_total', 'counter', 'Size of response bodies'),
+)
+
+
+def format_value(value):
+    # Счётчики-количества выводятся целыми, время - без потери точности
+    if isinstance(value, int):
+        return str(value)
+    return repr(float(value))
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.endpoints = defaultdict(lambda: dict.fromkeys(
+            (name for name, _, _ in METRICS), 0
+        ))
+
+    def record(self, endpoint, **values):
+        with self.lock:
+            counters = self.endpoints[endpoint]
+            counters['requests_total'] += 1
+            for name, value in values.items():
+                counters[name] += value
+
+    def render(self):
+        with self.lock:
+            endpoints = {
+                endpoint: dict(counters)
+                for endpoint, counters in self.endpoints.items()
+            }
+        lines = []
+        for name, metric_type, description in METRICS:
+            lines.append(f'# HELP foodgram_{name} {description}')
+            lines.append(f'# TYPE foodgram_{name} {metric_type}')
+            for (view, method), counters in sorted(endpoints.items()):
+                lines.append(
+                    f'foodgram_{name}{{view="{view}",method="{method}"}} '
+                    f'{format_value(counters[name])}'
+                )
+        return '\n'.join(lines) + '\n'
+
+
+registry = MetricsRegistry()
+
+
+def metrics_view(request):
+    token = settings.METRICS_TOKEN
+    authorized = (
+        token and request.headers.get('Authorization') == f'Bearer {token}'
+    )
+    if not authorized and not request.user.is_staff:
+        return HttpResponseForbidden()
+    return HttpResponse(
+        registry.render(),
+        content_type='text/plain; version=0.0.4; charset=utf-8',
+    )
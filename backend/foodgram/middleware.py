@@ -0,0 +1,169 @@
+import asyncio
+import logging
+import time
+from collections import Counter
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import connection
+from django.db.backends.signals import connection_created
+from django.views import View
+
+from foodgram.metrics import registry
+
+logger = logging.getLogger(__name__)
+
+# contextvars переходят в sync_to_async, поэтому запросы из потоков
+# ASGI-обработчика попадают в счётчики своего запроса
+current_recorder = ContextVar('current_recorder', default=None)
+
+KNOWN_METHODS = {method.upper() for method in View.http_method_names}
+OTHER_METHOD = 'OTHER'
+ANY_METHOD = 'ANY'
+UNRESOLVED_VIEW = 'unresolved'
+
+
+class QueryRecorder:
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+        self.statements = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.seconds += time.perf_counter() - started
+            self.count += 1
+            self.statements[sql] += 1
+
+    @property
+    def duplicates(self):
+        return {
+            sql: count for sql, count in self.statements.items()
+            if count >= settings.METRICS_DUPLICATE_THRESHOLD
+        }
+
+
+def record_query(execute, sql, params, many, context):
+    recorder = current_recorder.get()
+    if recorder is None:
+        return execute(sql, params, many, context)
+    return recorder(execute, sql, params, many, context)
+
+
+def install_recorder(connection, **kwargs):
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+connection_created.connect(install_recorder)
+
+
+class MetricsMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if asyncio.iscoroutinefunction(get_response):
+            self._is_coroutine = asyncio.coroutines._is_coroutine
+
+    def __call__(self, request):
+        if asyncio.iscoroutinefunction(self.get_response):
+            return self.__acall__(request)
+        install_recorder(connection)
+        recorder, token, started = self.start(request)
+        try:
+            response = self.get_response(request)
+        finally:
+            current_recorder.reset(token)
+        return self.finish(request, response, recorder, started)
+
+    async def __acall__(self, request):
+        recorder, token, started = self.start(request)
+        try:
+            response = await self.get_response(request)
+        finally:
+            current_recorder.reset(token)
+        return self.finish(request, response, recorder, started)
+
+    def start(self, request):
+        request.metrics_view_started = None
+        request.metrics_view_seconds = None
+        request.metrics_render_seconds = 0.0
+        recorder = QueryRecorder()
+        return recorder, current_recorder.set(recorder), time.perf_counter()
+
+    def finish(self, request, response, recorder, started):
+        duration = time.perf_counter() - started
+        endpoint = self.get_endpoint(request)
+        view_seconds = request.metrics_view_seconds
+        if view_seconds is None:
+            # Ответ без рендеринга: view работала до конца запроса
+            view_seconds = (
+                0.0 if request.metrics_view_started is None
+                else time.perf_counter() - request.metrics_view_started
+            )
+        duplicates = recorder.duplicates
+        if duplicates:
+            logger.warning(
+                'Repeated queries in %s %s: %s',
+                request.method,
+                endpoint[0],
+                '; '.join(
+                    f'{count} x {sql[:200]}'
+                    for sql, count in duplicates.items()
+                ),
+            )
+        size = 0 if response.streaming else len(response.content)
+        registry.record(
+            endpoint,
+            db_queries_total=recorder.count,
+            db_duplicate_queries_total=sum(
+                count - 1 for count in duplicates.values()
+            ),
+            db_seconds_total=recorder.seconds,
+            view_seconds_total=view_seconds,
+            renderer_seconds_total=request.metrics_render_seconds,
+            duration_seconds_total=duration,
+            response_bytes_total=size,
+        )
+        if settings.DEBUG:
+            response['X-DB-Queries'] = recorder.count
+            response['X-DB-Duplicate-Queries'] = len(duplicates)
+            response['X-DB-Time'] = f'{recorder.seconds * 1000:.1f}ms'
+            response['X-View-Time'] = f'{view_seconds * 1000:.1f}ms'
+            response['X-Render-Time'] = (
+                f'{request.metrics_render_seconds * 1000:.1f}ms'
+            )
+            response['X-Response-Time'] = f'{duration * 1000:.1f}ms'
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        request.metrics_view_started = time.perf_counter()
+
+    def process_template_response(self, request, response):
+        started = time.perf_counter()
+        if request.metrics_view_started is not None:
+            request.metrics_view_seconds = (
+                started - request.metrics_view_started
+            )
+
+        def rendered(response):
+            request.metrics_render_seconds += time.perf_counter() - started
+
+        response.add_post_render_callback(rendered)
+        return response
+
+    def get_endpoint(self, request):
+        # Метод и адрес присылает клиент: произвольные значения не должны
+        # порождать новые ряды счётчиков
+        match = request.resolver_match
+        if match is None:
+            return UNRESOLVED_VIEW, ANY_METHOD
+        method = request.method
+        if method not in KNOWN_METHODS:
+            method = OTHER_METHOD
+        return match.view_name, method
@@ -27,6 +27,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'foodgram.middleware.MetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -69,6 +70,35 @@ DATABASES = {
     }
 }
 
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv(
+            'CACHE_BACKEND',
+            default='django.core.cache.backends.locmem.LocMemCache',
+        ),
+        'LOCATION': os.getenv('CACHE_LOCATION', default='foodgram'),
+    }
+}
+
+# Кэш в памяти процесса не виден другим процессам (воркерам gunicorn,
+# manage.py), поэтому версии таблиц в нём периодически сверяются с базой
+CACHE_IS_SHARED = CACHES['default']['BACKEND'] not in (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+TABLE_VERSION_TIMEOUT = None if CACHE_IS_SHARED else int(
+    os.getenv('TABLE_VERSION_TIMEOUT', default=60)
+)
+RESPONSE_CACHE_TIMEOUT = int(
+    os.getenv('RESPONSE_CACHE_TIMEOUT', default=24 * 60 * 60)
+)
+RESPONSE_CACHE_LOCAL_SIZE = 256
+AUTH_TOKEN_CACHE_TIMEOUT = int(
+    os.getenv('AUTH_TOKEN_CACHE_TIMEOUT', default=5 * 60)
+)
+AUTH_TOKEN_CACHE_LOCAL_TIMEOUT = 30
+AUTH_TOKEN_CACHE_LOCAL_SIZE = 1024
+
 AUTH_USER_MODEL = 'users.User'
 
 AUTH_PASSWORD_VALIDATORS = [
@@ -97,7 +127,12 @@ REST_FRAMEWORK = {
         'rest_framework.permissions.IsAuthenticatedOrReadOnly',
     ],
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework.authentication.TokenAuthentication'
+        'users.authentication.CachingTokenAuthentication'
+    ],
+    'DEFAULT_PARSER_CLASSES': [
+        'foodgram.parsers.LimitedJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
     ],
 }
 
@@ -125,7 +160,45 @@ USE_TZ = True
 STATIC_URL = '/static_backend/'
 STATIC_ROOT = os.path.join(BASE_DIR, 'static_backend')
 
+DATA_UPLOAD_MAX_MEMORY_SIZE = 15 * 1024 * 1024
+
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+INGREDIENT_SEARCH_INDEX = os.getenv(
+    'INGREDIENT_SEARCH_INDEX', default='True'
+) == 'True'
+
+RECIPE_SEARCH_LIMIT = 1000
+
+# Периоды полураспада (в часах) для оценок популярности рецептов
+RECIPE_POPULAR_HALF_LIFE = int(
+    os.getenv('RECIPE_POPULAR_HALF_LIFE', default=30 * 24)
+)
+RECIPE_TRENDING_HALF_LIFE = int(
+    os.getenv('RECIPE_TRENDING_HALF_LIFE', default=24)
+)
+
+PDF_CACHE_DIR = os.getenv(
+    'PDF_CACHE_DIR', default=os.path.join(BASE_DIR, 'cache', 'pdf')
+)
+PDF_CACHE_MAX_SIZE = int(
+    os.getenv('PDF_CACHE_MAX_SIZE', default=50 * 1024 * 1024)
+)
+
+SERVER_MODE = os.getenv('SERVER_MODE', default='wsgi')
+PDF_RENDER_WORKERS = int(os.getenv(
+    'PDF_RENDER_WORKERS', default=2 if SERVER_MODE == 'asgi' else 0
+))
+
+METRICS_TOKEN = os.getenv('METRICS_TOKEN', default='')
+METRICS_DUPLICATE_THRESHOLD = 3
+
+RECIPE_IMAGE_MAX_UPLOAD_SIZE = 10 * 1024 * 1024
+RECIPE_IMAGE_MAX_PIXELS = 40_000_000
+RECIPE_IMAGE_MAX_SIZE = (1280, 1280)
+RECIPE_THUMBNAIL_SIZE = (480, 480)
+RECIPE_IMAGE_FORMAT = 'WEBP'
+RECIPE_IMAGE_QUALITY = 80
+
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
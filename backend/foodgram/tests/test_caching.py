@@ -0,0 +1,40 @@
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+
+from foodgram.caching import (bump_table_version, get_table_version,
+                              get_version_key, local_versions)
+from recipes.models import Ingredient
+
+
+@override_settings(CACHE_IS_SHARED=False)
+class LocalTableVersionTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        local_versions.clear()
+        self.version = get_table_version(Ingredient)
+
+    def expire(self):
+        cache.delete(get_version_key(Ingredient))
+
+    def test_unchanged_table_keeps_version(self):
+        self.expire()
+        with self.assertNumQueries(1):
+            self.assertEqual(get_table_version(Ingredient), self.version)
+
+    def test_rows_added_elsewhere_change_version(self):
+        # bulk_create не отправляет сигналов, как и запись из другого
+        # процесса не меняет версию в памяти этого
+        Ingredient.objects.bulk_create([
+            Ingredient(name='Соль', measurement_unit='г'),
+        ])
+        self.assertEqual(get_table_version(Ingredient), self.version)
+        self.expire()
+        self.assertNotEqual(get_table_version(Ingredient), self.version)
+
+    def test_bumped_version_is_not_restored(self):
+        bump_table_version(Ingredient)
+        bumped = get_table_version(Ingredient)
+        self.expire()
+        version = get_table_version(Ingredient)
+        self.assertNotEqual(version, self.version)
+        self.assertNotEqual(version, bumped)
@@ -0,0 +1,38 @@
+from unittest import mock
+
+from django.test import SimpleTestCase, TestCase
+
+from foodgram.metrics import MetricsRegistry, format_value
+
+
+class FormatValueTest(SimpleTestCase):
+    def test_values_keep_precision(self):
+        self.assertEqual(format_value(12345678), '12345678')
+        self.assertEqual(format_value(0.1 + 0.2), '0.30000000000000004')
+        self.assertEqual(format_value(1234567.5), '1234567.5')
+
+
+class EndpointLabelsTest(TestCase):
+    def setUp(self):
+        self.registry = MetricsRegistry()
+        patcher = mock.patch('foodgram.middleware.registry', self.registry)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_client_values_do_not_add_series(self):
+        for number in range(3):
+            self.client.generic(f'METHOD{number}', '/api/recipes/')
+            self.client.get(f'/api/missing{number}/')
+            self.client.generic(f'METHOD{number}', f'/api/missing{number}/')
+        self.client.get('/api/recipes/')
+        self.assertEqual(
+            {
+                endpoint: counters['requests_total']
+                for endpoint, counters in self.registry.endpoints.items()
+            },
+            {
+                ('recipes:recipes-list', 'OTHER'): 3,
+                ('recipes:recipes-list', 'GET'): 1,
+                ('unresolved', 'ANY'): 6,
+            },
+        )
@@ -1,7 +1,10 @@
-from django.contrib.admin import ModelAdmin, display, register
+from django.contrib.admin import ModelAdmin, TabularInline, display, register
 
 from .models import (Favorite, Ingredient, Recipe, RecipeIngredient,
-                     ShoppingCart, Tag)
+                     ShoppingCart, ShoppingListItem, ShoppingListJob, Tag)
+from .search import record_recipe_changes
+from .serializers import RecipeSnapshotSerializer
+from .shopping_list import track_shopping_lists
 
 
 @register(Tag)
@@ -21,50 +24,110 @@ class IngredientAdmin(ModelAdmin):
     empty_value_display = '-'
 
 
+class RecipeIngredientInline(TabularInline):
+    model = RecipeIngredient
+    autocomplete_fields = ('ingredient',)
+    min_num = 1
+    extra = 0
+
+
 @register(Recipe)
 class RecipeAdmin(ModelAdmin):
-    list_display = ('name', 'author',)
+    list_display = (
+        'name', 'author', 'favorites_count', 'carts_count',
+        'popular_score', 'trending_score',
+    )
     list_filter = ('name', 'author', 'tags',)
+    exclude = ('ingredients',)
+    inlines = (RecipeIngredientInline,)
     readonly_fields = ('added_in_favorites',)
     empty_value_display = '-'
 
     @display(description='Общее число добавлений в избранное')
     def added_in_favorites(self, obj):
-        return obj.favorites.count()
+        return obj.favorites_count
+
+    def save_model(self, request, obj, form, change):
+        if 'image' in form.changed_data:
+            obj.image_processed = False
+            obj.thumbnail.delete(save=False)
+        super().save_model(request, obj, form, change)
+
+    def save_related(self, request, form, formsets, change):
+        with track_shopping_lists([form.instance.pk] if change else []):
+            super().save_related(request, form, formsets, change)
+        record_recipe_changes([form.instance.pk])
+        RecipeSnapshotSerializer.refresh([form.instance])
 
 
 @register(RecipeIngredient)
 class CountOfIngredientAdmin(ModelAdmin):
     list_display = (
-        'id', 'ingredient', 'amount', 'get_measurement_unit',
-        'get_recipes_count',
+        'id', 'recipe', 'ingredient', 'amount', 'get_measurement_unit',
     )
     readonly_fields = ('get_measurement_unit',)
     list_filter = ('ingredient',)
+    list_select_related = ('recipe', 'ingredient',)
     ordering = ('ingredient',)
     empty_value_display = '-'
 
     @display(description='Единица измерения')
     def get_measurement_unit(self, obj):
-        try:
-            return obj.ingredient.measurement_unit
-        except RecipeIngredient.ingredient.RelatedObjectDoesNotExist:
-            return '-'
-
-    @display(description='Количество ссылок в рецептах')
-    def get_recipes_count(self, obj):
-        return obj.recipes.count()
+        return obj.ingredient.measurement_unit
+
+    def save_model(self, request, obj, form, change):
+        recipe_ids = {obj.recipe_id, form.initial.get('recipe')} - {None}
+        with track_shopping_lists(recipe_ids):
+            super().save_model(request, obj, form, change)
+        record_recipe_changes(recipe_ids)
+        RecipeSnapshotSerializer.refresh_queryset(
+            Recipe.objects.filter(pk__in=recipe_ids)
+        )
+
+    def delete_model(self, request, obj):
+        with track_shopping_lists([obj.recipe_id]):
+            super().delete_model(request, obj)
+        record_recipe_changes([obj.recipe_id])
+        RecipeSnapshotSerializer.refresh([obj.recipe])
+
+    def delete_queryset(self, request, queryset):
+        recipe_ids = set(queryset.values_list('recipe_id', flat=True))
+        with track_shopping_lists(recipe_ids):
+            super().delete_queryset(request, queryset)
+        record_recipe_changes(recipe_ids)
+        RecipeSnapshotSerializer.refresh_queryset(
+            Recipe.objects.filter(pk__in=recipe_ids)
+        )
 
 
 @register(Favorite)
 class FavoriteAdmin(ModelAdmin):
-    list_display = ('user',)
-    list_filter = ('user', 'recipes',)
+    list_display = ('user', 'recipe',)
+    list_filter = ('user',)
+    list_select_related = ('user', 'recipe',)
     empty_value_display = '-'
 
 
 @register(ShoppingCart)
 class ShoppingCartAdmin(ModelAdmin):
-    list_display = ('user', )
-    list_filter = ('user', 'recipes')
+    list_display = ('user', 'recipe',)
+    list_filter = ('user',)
+    list_select_related = ('user', 'recipe',)
+    empty_value_display = '-'
+
+
+@register(ShoppingListItem)
+class ShoppingListItemAdmin(ModelAdmin):
+    list_display = ('user', 'ingredient', 'amount',)
+    list_filter = ('user',)
+    list_select_related = ('user', 'ingredient',)
+    readonly_fields = ('user', 'ingredient', 'amount',)
+    empty_value_display = '-'
+
+
+@register(ShoppingListJob)
+class ShoppingListJobAdmin(ModelAdmin):
+    list_display = ('id', 'user', 'status', 'created', 'finished',)
+    list_filter = ('status',)
+    readonly_fields = ('rows', 'cache_key', 'created', 'finished',)
     empty_value_display = '-'
@@ -0,0 +1,19 @@
+from asgiref.sync import sync_to_async
+
+from foodgram.caching import accepts_json, aget_cached_response
+
+
+def async_reference_list(viewset):
+    model = viewset.queryset.model
+    sync_view = sync_to_async(viewset.as_view({'get': 'list'}))
+
+    async def view(request, *args, **kwargs):
+        if request.method in ('GET', 'HEAD') and accepts_json(request):
+            response = await aget_cached_response(request, model)
+            if response is not None:
+                return response
+        return await sync_view(request, *args, **kwargs)
+
+    # csrf_exempt в Django 4.0 не умеет оборачивать корутины
+    view.csrf_exempt = True
+    return view
@@ -0,0 +1,49 @@
+import bisect
+import threading
+
+from foodgram.caching import get_table_version
+from recipes.models import Ingredient
+
+
+class IngredientIndex:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.keys = []
+        self.rows = []
+        self.version = None
+
+    def build(self):
+        rows = sorted(
+            Ingredient.objects.values('id', 'name', 'measurement_unit'),
+            key=lambda row: (row['name'].lower(), row['id']),
+        )
+        return [row['name'].lower() for row in rows], rows
+
+    def get_entries(self):
+        version = get_table_version(Ingredient)
+        if self.version != version:
+            with self.lock:
+                if self.version != version:
+                    self.keys, self.rows = self.build()
+                    self.version = version
+        return self.keys, self.rows
+
+    def search(self, value, limit=None):
+        key = value.lower()
+        keys, rows = self.get_entries()
+        start = bisect.bisect_left(keys, key)
+        end = start
+        while end < len(keys) and keys[end].startswith(key):
+            end += 1
+        found = list(range(start, end))
+        if limit is None or len(found) < limit:
+            for position, name in enumerate(keys):
+                if start <= position < end or key not in name:
+                    continue
+                found.append(position)
+                if limit is not None and len(found) == limit:
+                    break
+        return [rows[position] for position in found[:limit]]
+
+
+ingredient_index = IngredientIndex()
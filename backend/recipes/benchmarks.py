@@ -0,0 +1,391 @@
+import base64
+import random
+import statistics
+import time
+import tracemalloc
+from datetime import timedelta
+from io import BytesIO, StringIO
+
+from django.core.management import call_command
+from django.db import connection
+from django.db.models import Count, IntegerField, Q, Value
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.utils import timezone
+from drf_extra_fields.fields import Base64ImageField as LegacyBase64ImageField
+from PIL import Image
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from foodgram.caching import bump_table_version
+from foodgram.paginations import LimitPageSizePagination
+from recipes.autocomplete import ingredient_index
+from recipes.fields import Base64ImageField
+from recipes.filters import RECIPE_ORDERINGS, IngredientSearchFilter
+from recipes.models import (Favorite, Ingredient, Recipe, RecipeIngredient,
+                            ShoppingCart, Tag)
+from recipes.scores import get_recipe_scores, update_recipe_scores
+from recipes.search import (recipe_ingredient_index, recipe_search_index,
+                            search_by_ingredients, search_recipes)
+from users.models import Subscription, User
+
+SEARCH_PAGE_SIZE = 6
+TRENDING_DAYS = 7
+
+
+def measure(func, repeat):
+    timings = []
+    with CaptureQueriesContext(connection) as queries:
+        for _ in range(repeat):
+            start = time.perf_counter()
+            func()
+            timings.append((time.perf_counter() - start) * 1000)
+    timings.sort()
+    return {
+        'p50_ms': round(statistics.median(timings), 3),
+        'p95_ms': round(timings[int(len(timings) * 0.95) - 1], 3),
+        'queries': len(queries) / repeat,
+    }
+
+
+def union_search(value):
+    queryset = Ingredient.objects.all()
+    start_with_queryset = queryset.filter(name__istartswith=value).annotate(
+        order=Value(0, IntegerField())
+    )
+    contain_queryset = queryset.filter(name__icontains=value).exclude(
+        pk__in=start_with_queryset.values_list('id', flat=True)
+    ).annotate(order=Value(1, IntegerField()))
+    return list(start_with_queryset.union(contain_queryset).order_by('order'))
+
+
+def ranked_search(value):
+    search = IngredientSearchFilter().search_by_name
+    return list(search(Ingredient.objects.all(), 'name', value))
+
+
+def ingredient_search(options):
+    names = list(Ingredient.objects.values_list('name', flat=True))
+    if not names:
+        return {}
+    sample = random.Random(options['seed']).sample(
+        names, min(len(names), 50)
+    )
+    values = [name[:length] for name in sample for length in (1, 2, 3)]
+    values += [name[1:4] for name in sample if len(name) > 4]
+    repeat = options['repeat']
+    ingredient_index.get_entries()
+    engines = {
+        'union': union_search,
+        'ranked_query': ranked_search,
+        'index': ingredient_index.search,
+    }
+    return {
+        engine: measure(
+            lambda: [search(value) for value in values], repeat,
+        ) | {'lookups': len(values)}
+        for engine, search in engines.items()
+    }
+
+
+def icontains_search(value):
+    return list(
+        Recipe.objects.filter(
+            Q(name__icontains=value) | Q(text__icontains=value)
+        ).values_list('pk', flat=True)[:SEARCH_PAGE_SIZE]
+    )
+
+
+def full_text_search(value):
+    return list(
+        search_recipes(Recipe.objects.all(), value)
+        .values_list('pk', flat=True)[:SEARCH_PAGE_SIZE]
+    )
+
+
+def recipe_search(options):
+    names = list(Recipe.objects.values_list('name', flat=True))
+    if not names:
+        return {}
+    words = [
+        word for name in random.Random(options['seed']).sample(
+            names, min(len(names), 50)
+        )
+        for word in name.split() if not word.isdigit()
+    ]
+    started = time.perf_counter()
+    recipe_search_index.get_postings()
+    engines = {
+        'icontains': icontains_search,
+        'full_text': full_text_search,
+    }
+    return {
+        'backend': connection.vendor,
+        'index_build_ms': round((time.perf_counter() - started) * 1000, 3),
+    } | {
+        engine: measure(
+            lambda: [search(word) for word in words], options['repeat'],
+        ) | {'lookups': len(words)}
+        for engine, search in engines.items()
+    }
+
+
+def aggregate_ingredient_search(ingredient_ids):
+    return list(
+        Recipe.objects.filter(
+            recipe_ingredients__ingredient_id__in=ingredient_ids,
+        ).annotate(
+            matched=Count('recipe_ingredients'),
+        ).order_by('-matched', '-pub_date', '-id')
+        .values_list('pk', flat=True)[:SEARCH_PAGE_SIZE]
+    )
+
+
+def index_ingredient_search(ingredient_ids):
+    return list(
+        search_by_ingredients(Recipe.objects.all(), ingredient_ids)
+        .values_list('pk', flat=True)[:SEARCH_PAGE_SIZE]
+    )
+
+
+def recipe_ingredient_search(options):
+    recipe_ids = list(Recipe.objects.values_list('pk', flat=True))
+    if not recipe_ids:
+        return {}
+    generator = random.Random(options['seed'])
+    sample = generator.sample(recipe_ids, min(len(recipe_ids), 50))
+    pantries = []
+    for recipe_id in sample:
+        ingredient_ids = list(RecipeIngredient.objects.filter(
+            recipe_id=recipe_id,
+        ).values_list('ingredient_id', flat=True))
+        pantries.append(generator.sample(
+            ingredient_ids, min(len(ingredient_ids), 5),
+        ))
+    started = time.perf_counter()
+    recipe_ingredient_index.build()
+    build_ms = (time.perf_counter() - started) * 1000
+    recipe_ingredient_index.sync()
+    engines = {
+        'aggregate': aggregate_ingredient_search,
+        'index': index_ingredient_search,
+    }
+    return {
+        'index_build_ms': round(build_ms, 3),
+        'index_refresh': measure(
+            lambda: recipe_ingredient_index.refresh(sample[:1]),
+            options['repeat'],
+        ),
+    } | {
+        engine: measure(
+            lambda: [search(pantry) for pantry in pantries],
+            options['repeat'],
+        ) | {'lookups': len(pantries)}
+        for engine, search in engines.items()
+    }
+
+
+def aggregate_top(since=None):
+    favorites = Q(in_favorite__created__gte=since) if since else Q()
+    return list(
+        Recipe.objects.annotate(
+            total=Count('in_favorite', filter=favorites),
+        ).order_by('-total', '-pub_date', '-id')
+        .values_list('pk', flat=True)[:SEARCH_PAGE_SIZE]
+    )
+
+
+def score_top(ordering):
+    return list(
+        Recipe.objects.order_by(*RECIPE_ORDERINGS[ordering])
+        .values_list('pk', flat=True)[:SEARCH_PAGE_SIZE]
+    )
+
+
+def recipe_popularity(options):
+    if not Recipe.objects.exists():
+        return {}
+    repeat = options['repeat']
+    since = timezone.now() - timedelta(days=TRENDING_DAYS)
+    started = time.perf_counter()
+    checked, _ = update_recipe_scores(get_recipe_scores(), 500)
+    return {
+        'recipes': checked,
+        'update_ms': round((time.perf_counter() - started) * 1000, 3),
+        'aggregate_popular': measure(aggregate_top, repeat),
+        'aggregate_trending': measure(lambda: aggregate_top(since), repeat),
+        'score_popular': measure(lambda: score_top('popular'), repeat),
+        'score_trending': measure(lambda: score_top('trending'), repeat),
+    }
+
+
+def get_file_size(file):
+    try:
+        return file.size if file else 0
+    except OSError:
+        return 0
+
+
+def recipe_page_bytes(options):
+    pages = {}
+    recipes = list(Recipe.objects.all()[:LimitPageSizePagination.page_size])
+    for field in ('image', 'preview'):
+        sizes = [
+            get_file_size(
+                recipe.image if field == 'image'
+                else recipe.thumbnail or recipe.image
+            )
+            for recipe in recipes
+        ]
+        pages[field] = {
+            'page_bytes': sum(sizes),
+            'recipe_bytes': round(sum(sizes) / len(sizes)) if sizes else 0,
+        }
+    pages['processed'] = sum(recipe.image_processed for recipe in recipes)
+    pages['recipes'] = len(recipes)
+    return pages
+
+
+def make_base64_image(width, height):
+    image = Image.effect_noise((width, height), 60).convert('RGB')
+    buffer = BytesIO()
+    image.save(buffer, 'JPEG', quality=95)
+    encoded = base64.b64encode(buffer.getvalue()).decode()
+    return f'data:image/jpeg;base64,{encoded}', buffer.tell()
+
+
+def measure_peak_memory(func, data):
+    tracemalloc.start()
+    try:
+        func(data)
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def image_upload_memory(options):
+    data, size = make_base64_image(3000, 2000)
+    fields = {
+        'drf_extra_fields': LegacyBase64ImageField().to_internal_value,
+        'streaming': Base64ImageField().to_internal_value,
+    }
+    return {
+        name: {
+            'image_bytes': size,
+            'peak_bytes': measure_peak_memory(field, data),
+        }
+        for name, field in fields.items()
+    }
+
+
+API_ENDPOINTS = (
+    ('tags', '/api/tags/', False),
+    ('ingredients_search', '/api/ingredients/?name={prefix}', False),
+    ('recipes_anonymous', '/api/recipes/', False),
+    ('recipes', '/api/recipes/', True),
+    ('recipes_deep_page', '/api/recipes/?page={last_page}', True),
+    ('recipes_cursor', '/api/recipes/?cursor=', True),
+    ('recipes_tags', '/api/recipes/?tags={tag}&tags={other_tag}', True),
+    ('recipes_favorited', '/api/recipes/?is_favorited=1', True),
+    ('recipes_popular', '/api/recipes/?ordering=popular', True),
+    ('recipes_trending', '/api/recipes/?ordering=trending&cursor=', True),
+    ('recipe_detail', '/api/recipes/{recipe}/', True),
+    ('subscriptions', '/api/users/subscriptions/?recipes_limit=3', True),
+    (
+        'shopping_cart_txt',
+        '/api/recipes/download_shopping_cart/?format=txt',
+        True,
+    ),
+    ('shopping_cart_pdf', '/api/recipes/download_shopping_cart/', True),
+)
+
+
+def get_dataset_size():
+    return {
+        'users': User.objects.count(),
+        'recipes': Recipe.objects.count(),
+        'favorites': Favorite.objects.count(),
+        'shopping_carts': ShoppingCart.objects.count(),
+        'subscriptions': Subscription.objects.count(),
+    }
+
+
+def get_api_context(options):
+    rng = random.Random(options['seed'])
+    user = rng.choice(list(
+        User.objects.filter(shopping_cart__isnull=False)
+        .filter(subscriptions__isnull=False)
+        .distinct().values_list('pk', flat=True)
+    ))
+    tags = list(Tag.objects.values_list('slug', flat=True)[:2])
+    return {
+        'token': Token.objects.get_or_create(user_id=user)[0].key,
+        'prefix': Ingredient.objects.values_list('name', flat=True)
+        .order_by('?').first()[:2],
+        'last_page': Recipe.objects.count()
+        // LimitPageSizePagination.page_size,
+        'recipe': Recipe.objects.order_by('?').values_list(
+            'pk', flat=True
+        ).first(),
+        'tag': tags[0],
+        'other_tag': tags[-1],
+    }
+
+
+def request_endpoint(client, url, headers):
+    response = client.get(url, **headers)
+    if response.streaming:
+        b''.join(response.streaming_content)
+    return response.status_code
+
+
+def api_endpoints(options):
+    context = get_api_context(options)
+    client = APIClient()
+    results = {'dataset': get_dataset_size()}
+    for name, url, authenticated in API_ENDPOINTS:
+        url = url.format(**context)
+        headers = {}
+        if authenticated:
+            headers['HTTP_AUTHORIZATION'] = f'Token {context["token"]}'
+        status = request_endpoint(client, url, headers)
+        results[name] = measure(
+            lambda: request_endpoint(client, url, headers), options['repeat'],
+        ) | {'status': status}
+    return results
+
+
+def api(options):
+    with override_settings(ALLOWED_HOSTS=['testserver'], DEBUG=False):
+        if not options['sizes']:
+            return api_endpoints(options)
+        old_name = connection.settings_dict['NAME']
+        connection.creation.create_test_db(verbosity=0, autoclobber=True)
+        try:
+            results = {}
+            for size in options['sizes']:
+                call_command('flush', interactive=False, verbosity=0)
+                call_command(
+                    'generate_data',
+                    users=size,
+                    seed=options['seed'],
+                    stdout=StringIO(),
+                )
+                results[f'users_{size}'] = api_endpoints(options)
+            return results
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            bump_table_version(Tag)
+            bump_table_version(Ingredient)
+            bump_table_version(Recipe)
+            bump_table_version(RecipeIngredient)
+
+
+SUITES = {
+    'ingredient_search': ingredient_search,
+    'recipe_search': recipe_search,
+    'recipe_ingredient_search': recipe_ingredient_search,
+    'recipe_popularity': recipe_popularity,
+    'recipe_page_bytes': recipe_page_bytes,
+    'image_upload_memory': image_upload_memory,
+    'api': api,
+}
@@ -1,5 +1,14 @@
 FAVORITE_ADD_ERROR = 'Вы уже добавили рецепт в избранное'
 FAVORITE_DELETE_ERROR = 'В избранном нет этого рецепта'
 SHOPPING_CART_GET_ERROR = 'Данные о корзине не найдены'
+SHOPPING_CART_FORMAT_ERROR = 'Неподдерживаемый формат списка покупок'
 SHOPPING_CART_ADD_ERROR = 'Вы уже добавили рецепт в корзину'
 SHOPPING_CART_DELETE_ERROR = 'В корзине нет этого рецепта'
+SHOPPING_CART_JOB_ERROR = 'Не удалось сформировать список покупок'
+SHOPPING_CART_TEMPLATE = 'recipes/shopping_cart.html'
+SHOPPING_LIST_JOB_TTL = 24 * 60 * 60
+INGREDIENT_IDS_ERROR = 'Укажите id ингредиентов через запятую'
+IMAGE_INVALID_ERROR = 'Загрузите корректное изображение'
+IMAGE_TYPE_ERROR = 'Поддерживаются изображения JPEG, PNG, GIF и WebP'
+IMAGE_SIZE_ERROR = 'Размер изображения не должен превышать {} МБ'
+IMAGE_DIMENSIONS_ERROR = 'Слишком большое разрешение изображения'
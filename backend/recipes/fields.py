@@ -0,0 +1,93 @@
+import base64
+import binascii
+import uuid
+from tempfile import SpooledTemporaryFile
+
+from django.conf import settings
+from django.core.files.uploadedfile import UploadedFile
+from PIL import Image
+from rest_framework import serializers
+
+from recipes.constants import (IMAGE_DIMENSIONS_ERROR, IMAGE_INVALID_ERROR,
+                               IMAGE_SIZE_ERROR, IMAGE_TYPE_ERROR)
+
+IMAGE_SIGNATURES = (
+    (b'\xff\xd8\xff', 'jpeg'),
+    (b'\x89PNG\r\n\x1a\n', 'png'),
+    (b'GIF87a', 'gif'),
+    (b'GIF89a', 'gif'),
+)
+BASE64_PREFIX = ';base64,'
+BASE64_CHUNK_SIZE = 64 * 1024
+
+
+def get_image_type(header):
+    for signature, image_type in IMAGE_SIGNATURES:
+        if header.startswith(signature):
+            return image_type
+    if header[:4] == b'RIFF' and header[8:12] == b'WEBP':
+        return 'webp'
+    return None
+
+
+class Base64ImageField(serializers.ImageField):
+    def to_internal_value(self, data):
+        if not isinstance(data, str):
+            raise serializers.ValidationError(IMAGE_INVALID_ERROR)
+        start = data.find(BASE64_PREFIX)
+        start = 0 if start == -1 else start + len(BASE64_PREFIX)
+        max_size = settings.RECIPE_IMAGE_MAX_UPLOAD_SIZE
+        if (len(data) - start) // 4 * 3 > max_size:
+            raise serializers.ValidationError(
+                IMAGE_SIZE_ERROR.format(max_size // (1024 * 1024))
+            )
+        file = SpooledTemporaryFile(
+            max_size=settings.FILE_UPLOAD_MAX_MEMORY_SIZE
+        )
+        image_type = self.decode(data, start, file)
+        size = file.tell()
+        self.validate_image(file)
+        return UploadedFile(
+            file,
+            name=f'{uuid.uuid4()}.{image_type}',
+            content_type=f'image/{image_type}',
+            size=size,
+        )
+
+    def decode(self, data, start, file):
+        image_type = None
+        try:
+            for offset in range(start, len(data), BASE64_CHUNK_SIZE):
+                chunk = base64.b64decode(
+                    data[offset:offset + BASE64_CHUNK_SIZE], validate=True,
+                )
+                if image_type is None:
+                    image_type = get_image_type(chunk)
+                    if image_type is None:
+                        raise serializers.ValidationError(IMAGE_TYPE_ERROR)
+                file.write(chunk)
+        except (binascii.Error, ValueError):
+            raise serializers.ValidationError(IMAGE_INVALID_ERROR)
+        if image_type is None:
+            raise serializers.ValidationError(IMAGE_INVALID_ERROR)
+        return image_type
+
+    def validate_image(self, file):
+        file.seek(0)
+        try:
+            image = Image.open(file)
+            if image.width * image.height > settings.RECIPE_IMAGE_MAX_PIXELS:
+                raise serializers.ValidationError(IMAGE_DIMENSIONS_ERROR)
+            image.verify()
+        except (OSError, SyntaxError, Image.DecompressionBombError):
+            raise serializers.ValidationError(IMAGE_INVALID_ERROR)
+        file.seek(0)
+
+
+class PreviewImageField(serializers.ImageField):
+    def __init__(self, **kwargs):
+        kwargs['read_only'] = True
+        super().__init__(**kwargs)
+
+    def get_attribute(self, instance):
+        return instance.thumbnail or instance.image
@@ -1,15 +1,77 @@
-from django.db.models import IntegerField, Value
-from django_filters.rest_framework import (AllValuesMultipleFilter,
-                                           BooleanFilter, CharFilter,
-                                           FilterSet)
+from django import forms
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Case, Exists, IntegerField, OuterRef, Value, When
+from django_filters.rest_framework import (BooleanFilter, CharFilter,
+                                           ChoiceFilter, Filter, FilterSet)
+from django_filters.widgets import QueryArrayWidget
 
-from .models import Ingredient, Recipe
+from foodgram.caching import get_table_version
+
+from .constants import INGREDIENT_IDS_ERROR
+from .models import Ingredient, Recipe, Tag
+from .search import search_by_ingredients, search_recipes
+
+TAGS_MATCH_ANY = 'any'
+TAGS_MATCH_ALL = 'all'
+RECIPE_ORDERINGS = {
+    'popular': ('-popular_score', '-pub_date', '-id'),
+    'trending': ('-trending_score', '-pub_date', '-id'),
+}
+
+
+def get_tag_ids(slugs):
+    version, _ = get_table_version(Tag)
+    key = f'tag-slugs:{version}'
+    slug_map = cache.get(key)
+    if slug_map is None:
+        slug_map = dict(Tag.objects.values_list('slug', 'id'))
+        cache.set(key, slug_map, settings.RESPONSE_CACHE_TIMEOUT)
+    return {slug_map[slug] for slug in slugs if slug in slug_map}
+
+
+class SlugListField(forms.Field):
+    widget = QueryArrayWidget
+
+    def to_python(self, value):
+        return [
+            slug for item in value or [] for slug in item.split(',') if slug
+        ]
+
+
+class SlugListFilter(Filter):
+    field_class = SlugListField
+
+
+class IdListField(SlugListField):
+    def to_python(self, value):
+        ids = super().to_python(value)
+        if not all(item.isdecimal() for item in ids):
+            raise forms.ValidationError(INGREDIENT_IDS_ERROR)
+        return [int(item) for item in ids]
+
+
+class IdListFilter(Filter):
+    field_class = IdListField
 
 
 class RecipeFilter(FilterSet):
-    tags = AllValuesMultipleFilter(field_name='tags__slug')
+    tags = SlugListFilter(method='get_tags')
+    tags_match = ChoiceFilter(
+        choices=(
+            (TAGS_MATCH_ANY, TAGS_MATCH_ANY),
+            (TAGS_MATCH_ALL, TAGS_MATCH_ALL),
+        ),
+        method='get_tags_match',
+    )
     is_favorited = BooleanFilter(method='get_is_favorited')
     is_in_shopping_cart = BooleanFilter(method='get_is_in_shopping_cart')
+    search = CharFilter(method='get_search')
+    ingredients = IdListFilter(method='get_ingredients')
+    ordering = ChoiceFilter(
+        choices=[(ordering, ordering) for ordering in RECIPE_ORDERINGS],
+        method='get_ordering',
+    )
 
     class Meta:
         model = Recipe
@@ -17,6 +79,42 @@ class RecipeFilter(FilterSet):
             'author',
         ]
 
+    def get_tags(self, queryset, name, value):
+        if not value:
+            return queryset
+        tag_ids = get_tag_ids(value)
+        match_all = self.form.cleaned_data.get('tags_match') == TAGS_MATCH_ALL
+        if not tag_ids or match_all and len(tag_ids) < len(set(value)):
+            return queryset.none()
+        recipe_tags = Recipe.tags.through.objects.filter(
+            recipe_id=OuterRef('pk'),
+        )
+        if not match_all:
+            return queryset.filter(
+                Exists(recipe_tags.filter(tag_id__in=tag_ids))
+            )
+        for tag_id in tag_ids:
+            queryset = queryset.filter(
+                Exists(recipe_tags.filter(tag_id=tag_id))
+            )
+        return queryset
+
+    def get_tags_match(self, queryset, name, value):
+        return queryset
+
+    def get_search(self, queryset, name, value):
+        if not value.strip():
+            return queryset
+        return search_recipes(queryset, value)
+
+    def get_ingredients(self, queryset, name, value):
+        if not value:
+            return queryset
+        return search_by_ingredients(queryset, value)
+
+    def get_ordering(self, queryset, name, value):
+        return queryset.order_by(*RECIPE_ORDERINGS[value])
+
     def get_is_favorited(self, queryset, name, value):
         if value and not self.request.user.is_anonymous:
             return queryset.filter(in_favorite__user=self.request.user)
@@ -38,14 +136,10 @@ class IngredientSearchFilter(FilterSet):
     def search_by_name(self, queryset, name, value):
         if not value:
             return queryset
-        start_with_queryset = (
-            queryset.filter(name__istartswith=value).annotate(
-                order=Value(0, IntegerField())
+        return queryset.filter(name__icontains=value).annotate(
+            order=Case(
+                When(name__istartswith=value, then=Value(0)),
+                default=Value(1),
+                output_field=IntegerField(),
             )
-        )
-        contain_queryset = (
-            queryset.filter(name__icontains=value).exclude(
-                pk__in=(start_with_queryset.values_list('id', flat=True))
-            ).annotate(order=Value(1, IntegerField()))
-        )
-        return start_with_queryset.union(contain_queryset).order_by('order')
+        ).order_by('order', 'name')
@@ -0,0 +1,59 @@
+import os
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import transaction
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+
+class ImageProcessingError(Exception):
+    pass
+
+
+def encode_image(image, size):
+    image = image.copy()
+    image.thumbnail(size, Image.LANCZOS)
+    buffer = BytesIO()
+    image.save(
+        buffer,
+        settings.RECIPE_IMAGE_FORMAT,
+        quality=settings.RECIPE_IMAGE_QUALITY,
+    )
+    return ContentFile(buffer.getvalue())
+
+
+def get_image_name(name, suffix=''):
+    base = os.path.splitext(os.path.basename(name))[0]
+    return f'{base}{suffix}.{settings.RECIPE_IMAGE_FORMAT.lower()}'
+
+
+def process_recipe_image(recipe):
+    try:
+        with recipe.image.open('rb') as file:
+            image = Image.open(file)
+            image.load()
+    except (OSError, UnidentifiedImageError) as error:
+        raise ImageProcessingError(error)
+    image = ImageOps.exif_transpose(image)
+    if image.mode not in ('RGB', 'RGBA'):
+        has_alpha = 'A' in image.getbands() or 'transparency' in image.info
+        image = image.convert('RGBA' if has_alpha else 'RGB')
+    original = recipe.image.name
+    recipe.image.save(
+        get_image_name(original),
+        encode_image(image, settings.RECIPE_IMAGE_MAX_SIZE),
+        save=False,
+    )
+    if recipe.thumbnail:
+        recipe.thumbnail.delete(save=False)
+    recipe.thumbnail.save(
+        get_image_name(original, '_thumb'),
+        encode_image(image, settings.RECIPE_THUMBNAIL_SIZE),
+        save=False,
+    )
+    recipe.image_processed = True
+    recipe.save(update_fields=['image', 'thumbnail', 'image_processed'])
+    if original != recipe.image.name:
+        storage = recipe.image.storage
+        transaction.on_commit(lambda: storage.delete(original))
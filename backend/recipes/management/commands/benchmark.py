@@ -0,0 +1,45 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from recipes.benchmarks import SUITES
+
+
+class Command(BaseCommand):
+    help = 'Run performance benchmarks against the current database'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'suites',
+            nargs='*',
+            help=f'Suites to run: {", ".join(SUITES)}. Default: all',
+        )
+        parser.add_argument('--repeat', type=int, default=20)
+        parser.add_argument('--seed', type=int, default=1)
+        parser.add_argument(
+            '--sizes',
+            type=lambda value: [int(size) for size in value.split(',')],
+            default=[],
+            help='Comma separated user counts for the api suite. '
+                 'Each size is generated in a temporary test database',
+        )
+        parser.add_argument(
+            '--output',
+            help='Write the report as JSON to this file',
+        )
+
+    def handle(self, *args, **options):
+        unknown = set(options['suites']) - set(SUITES)
+        if unknown:
+            raise CommandError(f'Unknown suites: {", ".join(unknown)}')
+        report = {
+            suite: SUITES[suite](options)
+            for suite in options['suites'] or SUITES
+        }
+        for suite, results in report.items():
+            self.stdout.write(suite)
+            for name, result in results.items():
+                self.stdout.write(f'  {name}: {result}')
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as file:
+                json.dump(report, file, ensure_ascii=False, indent=2)
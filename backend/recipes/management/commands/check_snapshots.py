@@ -0,0 +1,49 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from recipes.models import Recipe
+from recipes.serializers import RecipeSnapshotSerializer
+
+
+class Command(BaseCommand):
+    help = 'Compare stored recipe list snapshots with the current data'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--fix',
+            action='store_true',
+            help='Rebuild snapshots that differ',
+        )
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def get_stale(self, recipes):
+        stored = {recipe.pk: recipe.snapshot for recipe in recipes}
+        stale = []
+        for recipe in recipes:
+            built = RecipeSnapshotSerializer(recipe).data
+            if stored[recipe.pk] != built:
+                recipe.snapshot = built
+                stale.append(recipe)
+        return stale
+
+    def handle(self, *args, **options):
+        ids = list(Recipe.objects.order_by('pk').values_list('pk', flat=True))
+        batch_size = options['batch_size']
+        stale_count = 0
+        for start in range(0, len(ids), batch_size):
+            recipes = list(
+                Recipe.objects.filter(pk__in=ids[start:start + batch_size])
+                .select_related('author')
+                .prefetch_related(*RecipeSnapshotSerializer.get_prefetch())
+            )
+            stale = self.get_stale(recipes)
+            stale_count += len(stale)
+            for recipe in stale:
+                self.stdout.write(f'Recipe {recipe.pk}: snapshot is stale')
+            if stale and options['fix']:
+                Recipe.objects.bulk_update(stale, ['snapshot'])
+        self.stdout.write(
+            f'Checked: {len(ids)}; stale: {stale_count}'
+            + ('; fixed' if options['fix'] and stale_count else '')
+        )
+        if stale_count and not options['fix']:
+            raise CommandError('Snapshots are stale, run with --fix')
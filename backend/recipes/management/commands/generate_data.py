@@ -0,0 +1,216 @@
+import os
+import random
+import time
+import uuid
+from collections import Counter
+from datetime import timedelta
+from io import BytesIO, StringIO
+
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+from PIL import Image
+
+from foodgram.caching import bump_table_version
+from recipes.models import (Favorite, Ingredient, Recipe, RecipeIngredient,
+                            ShoppingCart, Tag)
+from recipes.scores import get_recipe_scores, update_recipe_scores
+from recipes.serializers import RecipeSnapshotSerializer
+from recipes.shopping_list import (get_shopping_list_totals,
+                                   rebuild_shopping_lists)
+from users.models import Subscription, User
+
+BENCHMARK_PASSWORD = 'benchmark'
+BENCHMARK_IMAGE = 'recipes/images/benchmark.jpg'
+# Добавления в избранное и корзину распределяются по последним 90 дням
+BENCHMARK_HISTORY = timedelta(days=90)
+
+
+class Command(BaseCommand):
+    help = 'Generate a synthetic dataset for benchmarks'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=100)
+        parser.add_argument(
+            '--recipes', type=int, default=5,
+            help='Recipes per user on average',
+        )
+        parser.add_argument('--favorites', type=int, default=20)
+        parser.add_argument('--carts', type=int, default=5)
+        parser.add_argument('--subscriptions', type=int, default=10)
+        parser.add_argument('--min-ingredients', type=int, default=5)
+        parser.add_argument('--max-ingredients', type=int, default=30)
+        parser.add_argument('--seed', type=int, default=1)
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def load_reference_data(self):
+        for model, file_name in ((Ingredient, 'ingredients.csv'),
+                                 (Tag, 'tags.csv')):
+            if not model.objects.exists():
+                call_command(
+                    'importcsv',
+                    os.path.join(settings.BASE_DIR, 'data', file_name),
+                    model.__name__,
+                    stdout=StringIO(),
+                )
+        return (
+            list(Ingredient.objects.values_list('pk', flat=True)),
+            list(Tag.objects.values_list('pk', flat=True)),
+        )
+
+    def get_image(self):
+        if not default_storage.exists(BENCHMARK_IMAGE):
+            buffer = BytesIO()
+            Image.new('RGB', (640, 480), (200, 120, 40)).save(buffer, 'JPEG')
+            default_storage.save(
+                BENCHMARK_IMAGE, ContentFile(buffer.getvalue())
+            )
+        return BENCHMARK_IMAGE
+
+    def create_users(self, count):
+        prefix = self.prefix
+        password = make_password(BENCHMARK_PASSWORD)
+        return User.objects.bulk_create([
+            User(
+                email=f'{prefix}-{number}@example.com',
+                username=f'{prefix}-{number}',
+                first_name='Пользователь',
+                last_name=str(number),
+                password=password,
+            )
+            for number in range(count)
+        ], batch_size=self.batch_size)
+
+    def create_recipes(self, users, ingredient_ids, tag_ids):
+        image = self.get_image()
+        names = dict(Ingredient.objects.values_list('pk', 'name'))
+        choices = [
+            self.sample(
+                ingredient_ids,
+                self.random.randint(
+                    self.options['min_ingredients'],
+                    self.options['max_ingredients'],
+                ),
+            )
+            for _ in range(len(users) * self.options['recipes'])
+        ]
+        recipes = Recipe.objects.bulk_create([
+            Recipe(
+                author=self.random.choice(users),
+                name=f'{names[chosen[0]].capitalize()} {number}',
+                text='Синтетический рецепт: ' + ', '.join(
+                    names[ingredient_id] for ingredient_id in chosen
+                ),
+                cooking_time=self.random.randint(5, 180),
+                image=image,
+                image_processed=True,
+            )
+            for number, chosen in enumerate(choices)
+        ], batch_size=self.batch_size)
+        RecipeIngredient.objects.bulk_create([
+            RecipeIngredient(
+                recipe=recipe,
+                ingredient_id=ingredient_id,
+                amount=self.random.randint(1, 500),
+            )
+            for recipe, chosen in zip(recipes, choices)
+            for ingredient_id in chosen
+        ], batch_size=self.batch_size)
+        Recipe.tags.through.objects.bulk_create([
+            Recipe.tags.through(recipe=recipe, tag_id=tag_id)
+            for recipe in recipes
+            for tag_id in self.sample(tag_ids, self.random.randint(1, 3))
+        ], batch_size=self.batch_size)
+        return recipes
+
+    def create_user_recipes(self, model, users, recipes, count):
+        now = timezone.now()
+        rows = [
+            model(
+                user=user,
+                recipe=recipe,
+                created=now - self.random.random() * BENCHMARK_HISTORY,
+            )
+            for user in users
+            for recipe in self.sample(recipes, count)
+        ]
+        model.objects.bulk_create(rows, batch_size=self.batch_size)
+        counts = Counter(row.recipe for row in rows)
+        for recipe, value in counts.items():
+            setattr(recipe, model.counter_field, value)
+        Recipe.objects.bulk_update(
+            counts, [model.counter_field], batch_size=self.batch_size,
+        )
+
+    def create_shopping_lists(self, users):
+        user_ids = [user.pk for user in users]
+        rebuild_shopping_lists(user_ids, get_shopping_list_totals(user_ids))
+
+    def update_scores(self):
+        update_recipe_scores(get_recipe_scores(), self.batch_size)
+
+    def create_subscriptions(self, users):
+        Subscription.objects.bulk_create([
+            Subscription(subscriber=user, subscription=author)
+            for user in users
+            for author in self.sample(users, self.options['subscriptions'])
+            if author != user
+        ], batch_size=self.batch_size)
+
+    def sample(self, population, count):
+        return self.random.sample(population, min(count, len(population)))
+
+    def step(self, name, func, *args):
+        started = time.monotonic()
+        result = func(*args)
+        self.stdout.write(
+            f'{name}: {(time.monotonic() - started) * 1000:.0f} ms'
+        )
+        return result
+
+    def handle(self, *args, **options):
+        if options['min_ingredients'] > options['max_ingredients']:
+            raise CommandError(
+                '--min-ingredients не может быть больше --max-ingredients'
+            )
+        self.options = options
+        self.batch_size = options['batch_size']
+        self.random = random.Random(options['seed'])
+        self.prefix = uuid.uuid4().hex[:8]
+        with transaction.atomic():
+            ingredient_ids, tag_ids = self.step(
+                'reference data', self.load_reference_data,
+            )
+            users = self.step('users', self.create_users, options['users'])
+            recipes = self.step(
+                'recipes', self.create_recipes,
+                users, ingredient_ids, tag_ids,
+            )
+            self.step(
+                'favorites', self.create_user_recipes,
+                Favorite, users, recipes, options['favorites'],
+            )
+            self.step(
+                'shopping carts', self.create_user_recipes,
+                ShoppingCart, users, recipes, options['carts'],
+            )
+            self.step('shopping lists', self.create_shopping_lists, users)
+            self.step('subscriptions', self.create_subscriptions, users)
+            self.step('scores', self.update_scores)
+            self.step(
+                'snapshots', RecipeSnapshotSerializer.refresh_queryset,
+                Recipe.objects.filter(
+                    author__username__startswith=f'{self.prefix}-'
+                ),
+            )
+        bump_table_version(Recipe)
+        bump_table_version(RecipeIngredient)
+        self.stdout.write(
+            f'Users: {len(users)}; recipes: {len(recipes)}; '
+            f'password: {BENCHMARK_PASSWORD}'
+        )
@@ -1,46 +1,100 @@
 import csv
+import time
+from itertools import islice
 
-from django.core.management.base import BaseCommand
-from django.db.utils import IntegrityError
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
 
+from foodgram.caching import bump_table_version
 from recipes import models
 
 
+def str_to_bool(value):
+    return value.lower() in ('1', 'true', 'yes', 'y', 'да')
+
+
 class Command(BaseCommand):
     help = 'Import data from csv file'
 
     def print_error(self, error, row, print_error):
         if print_error:
-            print('Error:', error.args, '\nRow ID:', row.get('id'))
+            self.stderr.write(f'Error: {error}\nRow: {row}')
 
     def add_arguments(self, parser):
         parser.add_argument('file_path', type=str)
         parser.add_argument('model', type=str)
-        parser.add_argument('print_errors', type=bool)
+        parser.add_argument(
+            'print_errors', type=str_to_bool, nargs='?', default=False,
+        )
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--dry-run', action='store_true')
+
+    def get_model(self, name):
+        model = getattr(models, name, None)
+        if not isinstance(model, type) or not issubclass(
+            model, models.models.Model
+        ):
+            raise CommandError(f'Модель {name} не найдена.')
+        return model
+
+    def validate_rows(self, model, rows, print_errors):
+        objects = []
+        for row in rows:
+            try:
+                instance = model(**row)
+                instance.full_clean(validate_unique=False)
+            except (TypeError, ValueError, ValidationError) as error:
+                self.print_error(error, row, print_errors)
+                continue
+            objects.append(instance)
+        return objects
+
+    def import_batches(self, model, reader, options):
+        total_count = 0
+        valid_count = 0
+        number = 0
+        while True:
+            rows = list(islice(reader, options['batch_size']))
+            if not rows:
+                break
+            number += 1
+            started = time.monotonic()
+            objects = self.validate_rows(
+                model, rows, options['print_errors'],
+            )
+            model.objects.bulk_create(objects, ignore_conflicts=True)
+            total_count += len(rows)
+            valid_count += len(objects)
+            self.stdout.write('Batch {}: {} rows, {:.1f} ms'.format(
+                number,
+                len(rows),
+                (time.monotonic() - started) * 1000,
+            ))
+        return total_count, valid_count
 
     def handle(self, *args, **options):
-        file_path = options['file_path']
-        print_errors = options['print_errors']
-        model = getattr(models, options['model'])
-        with open(file_path, encoding='utf-8', mode='r') as csv_file:
-            csv_reader = csv.DictReader(csv_file)
-            total_count = 0
-            successfull = 0
-            for row in csv_reader:
-                total_count += 1
-                try:
-                    model.objects.get_or_create(**row)
-                    successfull += 1
-                except IntegrityError as error:
-                    self.print_error(error, row, print_errors)
-                except ValueError as error:
-                    self.print_error(error, row, print_errors)
-                except AttributeError as error:
-                    print(f'Модель {options["model"]} не найдена. {error}')
-                    break
-            errors = total_count - successfull
-            print('Model: {}\nSuccessfull: {}; errors: {}'.format(
+        model = self.get_model(options['model'])
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size должен быть больше нуля.')
+        with open(options['file_path'], encoding='utf-8') as csv_file:
+            reader = csv.DictReader(csv_file)
+            with transaction.atomic():
+                before = model.objects.count()
+                total_count, valid_count = self.import_batches(
+                    model, reader, options,
+                )
+                successfull = model.objects.count() - before
+                if options['dry_run']:
+                    transaction.set_rollback(True)
+        if successfull and not options['dry_run']:
+            bump_table_version(model)
+        self.stdout.write(
+            'Model: {}\nSuccessfull: {}; skipped: {}; errors: {}{}'.format(
                 model.__name__,
                 successfull,
-                errors,
-            ))
+                valid_count - successfull,
+                total_count - valid_count,
+                ' (dry run)' if options['dry_run'] else '',
+            )
+        )
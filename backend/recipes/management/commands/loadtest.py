@@ -0,0 +1,94 @@
+import json
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urljoin
+
+import requests
+from django.core.management.base import BaseCommand
+
+DEFAULT_PATHS = (
+    '/api/tags/',
+    '/api/ingredients/?name=сол',
+    '/api/recipes/?limit=6',
+)
+
+
+class Command(BaseCommand):
+    help = 'Send concurrent requests to a running server'
+
+    def add_arguments(self, parser):
+        parser.add_argument('url', help='Server address, e.g. http://web:8000')
+        parser.add_argument(
+            '--paths',
+            type=lambda value: value.split(','),
+            default=list(DEFAULT_PATHS),
+            help='Comma separated paths requested in turn',
+        )
+        parser.add_argument(
+            '--concurrency',
+            type=lambda value: [int(level) for level in value.split(',')],
+            default=[1, 8, 32],
+            help='Comma separated numbers of concurrent clients',
+        )
+        parser.add_argument(
+            '--requests', type=int, default=500,
+            help='Requests per concurrency level',
+        )
+        parser.add_argument('--token', help='Auth token for the requests')
+        parser.add_argument('--timeout', type=float, default=30.0)
+        parser.add_argument(
+            '--output',
+            help='Write the report as JSON to this file',
+        )
+
+    def get_session(self):
+        session = getattr(self.local, 'session', None)
+        if session is None:
+            session = self.local.session = requests.Session()
+            if self.options['token']:
+                session.headers['Authorization'] = (
+                    f'Token {self.options["token"]}'
+                )
+        return session
+
+    def send(self, url):
+        started = time.perf_counter()
+        try:
+            response = self.get_session().get(
+                url, timeout=self.options['timeout'],
+            )
+            ok = response.status_code < 400
+        except requests.RequestException:
+            ok = False
+        return (time.perf_counter() - started) * 1000, ok
+
+    def run_level(self, concurrency, urls):
+        total = self.options['requests']
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            results = list(executor.map(
+                self.send, (urls[number % len(urls)]
+                            for number in range(total)),
+            ))
+        elapsed = time.perf_counter() - started
+        timings = sorted(timing for timing, _ in results)
+        return {
+            'requests_per_second': round(total / elapsed, 1),
+            'p50_ms': round(statistics.median(timings), 3),
+            'p95_ms': round(timings[int(len(timings) * 0.95) - 1], 3),
+            'errors': sum(1 for _, ok in results if not ok),
+        }
+
+    def handle(self, *args, **options):
+        self.options = options
+        self.local = threading.local()
+        urls = [urljoin(options['url'], path) for path in options['paths']]
+        report = {}
+        for concurrency in options['concurrency']:
+            report[concurrency] = self.run_level(concurrency, urls)
+            self.stdout.write(f'{concurrency}: {report[concurrency]}')
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as file:
+                json.dump(report, file, ensure_ascii=False, indent=2)
@@ -0,0 +1,57 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from recipes.models import ShoppingCart, ShoppingListItem
+from recipes.shopping_list import (get_shopping_list_totals,
+                                   get_stored_shopping_lists,
+                                   rebuild_shopping_lists)
+
+
+class Command(BaseCommand):
+    help = 'Rebuild stored shopping lists from shopping carts'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--check',
+            action='store_true',
+            help='Only compare stored lists with carts, do not rebuild',
+        )
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def get_user_ids(self):
+        return sorted(
+            set(ShoppingCart.objects.values_list('user_id', flat=True))
+            | set(ShoppingListItem.objects.values_list('user_id', flat=True))
+        )
+
+    def get_stale_users(self, totals, stored):
+        return {
+            user_id for user_id, _ in totals.keys() ^ stored.keys()
+        } | {
+            user_id for (user_id, ingredient_id), amount in totals.items()
+            if stored.get((user_id, ingredient_id)) != amount
+        }
+
+    def handle(self, *args, **options):
+        user_ids = self.get_user_ids()
+        batch_size = options['batch_size']
+        stale_count = 0
+        for start in range(0, len(user_ids), batch_size):
+            batch = user_ids[start:start + batch_size]
+            totals = get_shopping_list_totals(batch)
+            stale = self.get_stale_users(
+                totals, get_stored_shopping_lists(batch),
+            )
+            stale_count += len(stale)
+            for user_id in sorted(stale):
+                self.stdout.write(f'User {user_id}: shopping list is stale')
+            if stale and not options['check']:
+                rebuild_shopping_lists(stale, {
+                    key: amount for key, amount in totals.items()
+                    if key[0] in stale
+                })
+        self.stdout.write(
+            f'Checked: {len(user_ids)}; stale: {stale_count}'
+            + ('; rebuilt' if stale_count and not options['check'] else '')
+        )
+        if stale_count and options['check']:
+            raise CommandError('Shopping lists are stale, run without --check')
@@ -0,0 +1,124 @@
+import logging
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from recipes.constants import SHOPPING_CART_TEMPLATE, SHOPPING_LIST_JOB_TTL
+from recipes.images import ImageProcessingError, process_recipe_image
+from recipes.models import Recipe, ShoppingListJob
+from recipes.pdfrender import (PDFRenderError, get_pdf_template,
+                               render_cached_pdf)
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = 'Process queued shopping list jobs and recipe images'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Process the current queue and exit',
+        )
+        parser.add_argument(
+            '--interval',
+            type=float,
+            default=1.0,
+            help='Seconds to wait between queue polls',
+        )
+
+    def claim_job(self):
+        with transaction.atomic():
+            job = (
+                ShoppingListJob.objects.select_for_update(skip_locked=True)
+                .filter(status=ShoppingListJob.Status.PENDING)
+                .first()
+            )
+            if job is not None:
+                job.status = ShoppingListJob.Status.RUNNING
+                job.save(update_fields=['status'])
+        return job
+
+    def process_job(self, job):
+        try:
+            template = get_pdf_template(SHOPPING_CART_TEMPLATE)
+            render_cached_pdf(template, {'context': job.rows}, job.cache_key)
+            job.status = ShoppingListJob.Status.DONE
+        except PDFRenderError:
+            job.status = ShoppingListJob.Status.FAILED
+        except Exception:
+            # Непредвиденная ошибка не должна останавливать обработчик:
+            # задание помечается неудачным, очередь идёт дальше
+            logger.exception('Shopping list job %s failed', job.pk)
+            job.status = ShoppingListJob.Status.FAILED
+        job.finished = timezone.now()
+        job.save(update_fields=['status', 'finished'])
+
+    def process_image(self):
+        with transaction.atomic():
+            recipe = (
+                Recipe.objects.select_for_update(skip_locked=True)
+                .filter(image_processed=False)
+                .order_by('pk')
+                .first()
+            )
+            if recipe is None:
+                return False
+            try:
+                # Точка сохранения: после ошибки базы данных внешняя
+                # транзакция остаётся рабочей
+                with transaction.atomic():
+                    process_recipe_image(recipe)
+            except ImageProcessingError as error:
+                self.stderr.write(f'Recipe {recipe.pk}: {error}')
+                self.skip_image(recipe)
+            except Exception:
+                # Иначе рецепт с битым изображением выбирался бы снова
+                # при каждом перезапуске обработчика
+                logger.exception(
+                    'Recipe %s image processing failed', recipe.pk,
+                )
+                self.skip_image(recipe)
+        return True
+
+    def skip_image(self, recipe):
+        Recipe.objects.filter(pk=recipe.pk).update(image_processed=True)
+
+    def process_jobs(self):
+        processed = 0
+        job = self.claim_job()
+        while job is not None:
+            self.process_job(job)
+            processed += 1
+            job = self.claim_job()
+        return processed
+
+    def process_images(self):
+        processed = 0
+        while self.process_image():
+            processed += 1
+        return processed
+
+    def purge_jobs(self):
+        ShoppingListJob.objects.filter(
+            created__lt=timezone.now() - timedelta(
+                seconds=SHOPPING_LIST_JOB_TTL
+            )
+        ).delete()
+
+    def handle(self, *args, **options):
+        while True:
+            self.purge_jobs()
+            processed = self.process_jobs()
+            if processed:
+                self.stdout.write(f'Processed jobs: {processed}')
+            processed = self.process_images()
+            if processed:
+                self.stdout.write(f'Processed images: {processed}')
+            if options['once']:
+                break
+            time.sleep(options['interval'])
@@ -0,0 +1,34 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from recipes.scores import get_recipe_scores, update_recipe_scores
+
+
+class Command(BaseCommand):
+    help = 'Recompute popular and trending scores of recipes'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument(
+            '--interval',
+            type=float,
+            help='Repeat every given number of seconds instead of exiting',
+        )
+
+    def update(self, batch_size):
+        started = time.monotonic()
+        checked, updated = update_recipe_scores(
+            get_recipe_scores(), batch_size,
+        )
+        self.stdout.write(
+            f'Checked: {checked}; updated: {updated}; '
+            f'{(time.monotonic() - started) * 1000:.0f} ms'
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            self.update(options['batch_size'])
+            if options['interval'] is None:
+                break
+            time.sleep(options['interval'])
@@ -0,0 +1,39 @@
+# Generated by Django 4.0.1 on 2026-10-18 04:29
+
+import uuid
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('recipes', '0002_alter_recipeingredient_amount'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ShoppingListJob',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('rows', models.JSONField(verbose_name='Список покупок')),
+                ('cache_key', models.CharField(max_length=64, verbose_name='Ключ файла')),
+                ('status', models.CharField(choices=[('pending', 'В очереди'), ('running', 'Выполняется'), ('done', 'Готово'), ('failed', 'Ошибка')], default='pending', max_length=20, verbose_name='Статус')),
+                ('created', models.DateTimeField(auto_now_add=True, verbose_name='Создано')),
+                ('finished', models.DateTimeField(blank=True, null=True, verbose_name='Завершено')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='shopping_list_jobs', to=settings.AUTH_USER_MODEL, verbose_name='Пользователь')),
+            ],
+            options={
+                'verbose_name': 'Задача на список покупок',
+                'verbose_name_plural': 'Задачи на список покупок',
+                'ordering': ['created'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='shoppinglistjob',
+            index=models.Index(fields=['status', 'created'], name='shopping_list_job_queue_idx'),
+        ),
+    ]
@@ -0,0 +1,139 @@
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+BATCH_SIZE = 1000
+TABLES = (
+    ('Favorite', 'NewFavorite', 'favorites_count'),
+    ('ShoppingCart', 'NewShoppingCart', 'carts_count'),
+)
+
+
+def copy_to_rows(apps, schema_editor):
+    Recipe = apps.get_model('recipes', 'Recipe')
+    for legacy_name, name, counter_field in TABLES:
+        legacy = apps.get_model('recipes', legacy_name)
+        model = apps.get_model('recipes', name)
+        container = legacy._meta.model_name
+        rows = legacy.recipes.through.objects.values_list(
+            f'{container}__user_id', 'recipe_id',
+        )
+        model.objects.bulk_create(
+            (
+                model(user_id=user_id, recipe_id=recipe_id)
+                for user_id, recipe_id in rows.iterator()
+            ),
+            batch_size=BATCH_SIZE,
+        )
+        counts = (
+            model.objects.filter(recipe=OuterRef('pk'))
+            .values('recipe')
+            .annotate(total=Count('pk'))
+            .values('total')
+        )
+        Recipe.objects.update(
+            **{counter_field: Coalesce(Subquery(counts), 0)}
+        )
+
+
+def copy_to_containers(apps, schema_editor):
+    for legacy_name, name, _ in TABLES:
+        legacy = apps.get_model('recipes', legacy_name)
+        model = apps.get_model('recipes', name)
+        containers = {}
+        for user_id, recipe_id in model.objects.values_list(
+            'user_id', 'recipe_id',
+        ).iterator():
+            if user_id not in containers:
+                containers[user_id] = legacy.objects.create(user_id=user_id)
+            containers[user_id].recipes.add(recipe_id)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('recipes', '0003_shoppinglistjob'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='favorite',
+            name='user',
+            field=models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='legacy_favorites', to=settings.AUTH_USER_MODEL, verbose_name='Пользователь'),
+        ),
+        migrations.AlterField(
+            model_name='favorite',
+            name='recipes',
+            field=models.ManyToManyField(related_name='legacy_in_favorite', to='recipes.Recipe', verbose_name='Рецепты'),
+        ),
+        migrations.AlterField(
+            model_name='shoppingcart',
+            name='user',
+            field=models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='legacy_shopping_cart', to=settings.AUTH_USER_MODEL, verbose_name='Пользователь'),
+        ),
+        migrations.AlterField(
+            model_name='shoppingcart',
+            name='recipes',
+            field=models.ManyToManyField(related_name='legacy_in_shopping_carts', to='recipes.Recipe', verbose_name='Рецепты'),
+        ),
+        migrations.AddField(
+            model_name='recipe',
+            name='carts_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Добавлений в корзину'),
+        ),
+        migrations.AddField(
+            model_name='recipe',
+            name='favorites_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Добавлений в избранное'),
+        ),
+        migrations.CreateModel(
+            name='NewFavorite',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('recipe', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='in_favorite', to='recipes.recipe', verbose_name='Рецепт')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='favorites', to=settings.AUTH_USER_MODEL, verbose_name='Пользователь')),
+            ],
+            options={
+                'verbose_name': 'Избранный рецепт',
+                'verbose_name_plural': 'Избранные рецепты',
+            },
+        ),
+        migrations.CreateModel(
+            name='NewShoppingCart',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('recipe', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='in_shopping_carts', to='recipes.recipe', verbose_name='Рецепт')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='shopping_cart', to=settings.AUTH_USER_MODEL, verbose_name='Пользователь')),
+            ],
+            options={
+                'verbose_name': 'Рецепт в корзине',
+                'verbose_name_plural': 'Рецепты в корзине',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='newfavorite',
+            constraint=models.UniqueConstraint(fields=('user', 'recipe'), name='Уникальная запись пользователь - избранный рецепт'),
+        ),
+        migrations.AddConstraint(
+            model_name='newshoppingcart',
+            constraint=models.UniqueConstraint(fields=('user', 'recipe'), name='Уникальная запись пользователь - рецепт в корзине'),
+        ),
+        migrations.RunPython(copy_to_rows, copy_to_containers),
+        migrations.DeleteModel(
+            name='Favorite',
+        ),
+        migrations.DeleteModel(
+            name='ShoppingCart',
+        ),
+        migrations.RenameModel(
+            old_name='NewFavorite',
+            new_name='Favorite',
+        ),
+        migrations.RenameModel(
+            old_name='NewShoppingCart',
+            new_name='ShoppingCart',
+        ),
+    ]
@@ -0,0 +1,99 @@
+import django.core.validators
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Sum
+
+BATCH_SIZE = 1000
+
+
+def copy_to_rows(apps, schema_editor):
+    Recipe = apps.get_model('recipes', 'Recipe')
+    NewRecipeIngredient = apps.get_model('recipes', 'NewRecipeIngredient')
+    rows = (
+        Recipe.legacy_ingredients.through.objects
+        .filter(recipeingredient__ingredient__isnull=False)
+        .values('recipe_id', 'recipeingredient__ingredient_id')
+        .annotate(amount=Sum('recipeingredient__amount'))
+        .order_by()
+    )
+    NewRecipeIngredient.objects.bulk_create(
+        (
+            NewRecipeIngredient(
+                recipe_id=row['recipe_id'],
+                ingredient_id=row['recipeingredient__ingredient_id'],
+                amount=row['amount'],
+            )
+            for row in rows.iterator()
+        ),
+        batch_size=BATCH_SIZE,
+    )
+
+
+def copy_to_shared_rows(apps, schema_editor):
+    Recipe = apps.get_model('recipes', 'Recipe')
+    RecipeIngredient = apps.get_model('recipes', 'RecipeIngredient')
+    NewRecipeIngredient = apps.get_model('recipes', 'NewRecipeIngredient')
+    through = Recipe.legacy_ingredients.through
+    for row in NewRecipeIngredient.objects.iterator():
+        shared, _ = RecipeIngredient.objects.get_or_create(
+            ingredient_id=row.ingredient_id,
+            amount=row.amount,
+        )
+        through.objects.get_or_create(
+            recipe_id=row.recipe_id,
+            recipeingredient_id=shared.pk,
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0004_favorite_shoppingcart_rows'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='recipe',
+            name='ingredients',
+            field=models.ManyToManyField(related_name='legacy_recipes', to='recipes.RecipeIngredient', verbose_name='Ингредиенты'),
+        ),
+        migrations.RenameField(
+            model_name='recipe',
+            old_name='ingredients',
+            new_name='legacy_ingredients',
+        ),
+        migrations.CreateModel(
+            name='NewRecipeIngredient',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('amount', models.PositiveIntegerField(help_text='Требуемое количество для рецепта (целое число)', validators=[django.core.validators.MinValueValidator(1, 'Количество ингредиента должно быть больше нуля')], verbose_name='Количество')),
+                ('ingredient', models.ForeignKey(help_text='Выберите ингредиент', on_delete=django.db.models.deletion.PROTECT, related_name='recipe_ingredients', to='recipes.ingredient', verbose_name='Ингредиент')),
+                ('recipe', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='recipe_ingredients', to='recipes.recipe', verbose_name='Рецепт')),
+            ],
+            options={
+                'verbose_name': 'Ингредиент рецепта',
+                'verbose_name_plural': 'Ингредиенты рецепта',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='newrecipeingredient',
+            constraint=models.UniqueConstraint(fields=('recipe', 'ingredient'), name='Уникальная запись рецепт - ингредиент'),
+        ),
+        migrations.AddField(
+            model_name='recipe',
+            name='ingredients',
+            field=models.ManyToManyField(related_name='recipes', through='recipes.NewRecipeIngredient', to='recipes.Ingredient', verbose_name='Ингредиенты'),
+        ),
+        migrations.RunPython(copy_to_rows, copy_to_shared_rows),
+        migrations.RemoveField(
+            model_name='recipe',
+            name='legacy_ingredients',
+        ),
+        migrations.DeleteModel(
+            name='RecipeIngredient',
+        ),
+        migrations.RenameModel(
+            old_name='NewRecipeIngredient',
+            new_name='RecipeIngredient',
+        ),
+    ]
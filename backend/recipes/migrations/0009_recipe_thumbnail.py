@@ -0,0 +1,23 @@
+# Generated by Django 4.0.1 on 2026-10-18 04:43
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0008_recipe_author_pub_date_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='image_processed',
+            field=models.BooleanField(db_index=True, default=False, editable=False, verbose_name='Изображение обработано'),
+        ),
+        migrations.AddField(
+            model_name='recipe',
+            name='thumbnail',
+            field=models.ImageField(blank=True, editable=False, upload_to='recipes/thumbnails/', verbose_name='Миниатюра'),
+        ),
+    ]
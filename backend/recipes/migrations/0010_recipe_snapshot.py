@@ -0,0 +1,18 @@
+# Generated by Django 4.0.1 on 2026-10-18 04:48
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0009_recipe_thumbnail'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='snapshot',
+            field=models.JSONField(default=dict, editable=False, verbose_name='Данные для списка рецептов'),
+        ),
+    ]
@@ -0,0 +1,36 @@
+from django.db import migrations
+
+CREATE_SEARCH_VECTOR = (
+    'ALTER TABLE recipes_recipe ADD COLUMN IF NOT EXISTS search_vector '
+    'tsvector GENERATED ALWAYS AS ('
+    "setweight(to_tsvector('russian'::regconfig, coalesce(name, '')), 'A')"
+    " || setweight(to_tsvector('russian'::regconfig, coalesce(text, '')),"
+    " 'B')) STORED;"
+    'CREATE INDEX IF NOT EXISTS recipe_search_vector_idx '
+    'ON recipes_recipe USING gin (search_vector);'
+)
+DROP_SEARCH_VECTOR = (
+    'DROP INDEX IF EXISTS recipe_search_vector_idx;'
+    'ALTER TABLE recipes_recipe DROP COLUMN IF EXISTS search_vector;'
+)
+
+
+def create_search_vector(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute(CREATE_SEARCH_VECTOR)
+
+
+def drop_search_vector(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute(DROP_SEARCH_VECTOR)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0012_shoppinglistitem'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_vector, drop_search_vector),
+    ]
@@ -0,0 +1,34 @@
+from django.db import migrations
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+COUNTERS = (
+    ('Favorite', 'favorites_count'),
+    ('ShoppingCart', 'carts_count'),
+)
+
+
+def recount_counters(apps, schema_editor):
+    Recipe = apps.get_model('recipes', 'Recipe')
+    for name, counter_field in COUNTERS:
+        model = apps.get_model('recipes', name)
+        counts = (
+            model.objects.filter(recipe=OuterRef('pk'))
+            .values('recipe')
+            .annotate(total=Count('pk'))
+            .values('total')
+        )
+        Recipe.objects.update(
+            **{counter_field: Coalesce(Subquery(counts), 0)}
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0014_recipe_scores'),
+    ]
+
+    operations = [
+        migrations.RunPython(recount_counters, migrations.RunPython.noop),
+    ]
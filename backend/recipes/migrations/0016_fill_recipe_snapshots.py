@@ -0,0 +1,65 @@
+from django.db import migrations
+from django.db.models import Prefetch
+
+BATCH_SIZE = 500
+TAG_FIELDS = ('id', 'name', 'color', 'slug')
+AUTHOR_FIELDS = ('email', 'id', 'username', 'first_name', 'last_name')
+
+
+def get_snapshot(recipe):
+    # Тот же формат, что у RecipeSnapshotSerializer
+    return {
+        'tags': [
+            {field: getattr(tag, field) for field in TAG_FIELDS}
+            for tag in recipe.tags.all()
+        ],
+        'author': {
+            field: getattr(recipe.author, field) for field in AUTHOR_FIELDS
+        },
+        'ingredients': [
+            {
+                'id': item.ingredient.id,
+                'name': item.ingredient.name,
+                'measurement_unit': item.ingredient.measurement_unit,
+                'amount': item.amount,
+            }
+            for item in recipe.recipe_ingredients.all()
+        ],
+    }
+
+
+def fill_snapshots(apps, schema_editor):
+    Recipe = apps.get_model('recipes', 'Recipe')
+    RecipeIngredient = apps.get_model('recipes', 'RecipeIngredient')
+    ids = list(
+        Recipe.objects.filter(snapshot={}).order_by('pk')
+        .values_list('pk', flat=True)
+    )
+    for start in range(0, len(ids), BATCH_SIZE):
+        recipes = list(
+            Recipe.objects.filter(pk__in=ids[start:start + BATCH_SIZE])
+            .select_related('author')
+            .prefetch_related(
+                'tags',
+                Prefetch(
+                    'recipe_ingredients',
+                    queryset=RecipeIngredient.objects.select_related(
+                        'ingredient',
+                    ),
+                ),
+            )
+        )
+        for recipe in recipes:
+            recipe.snapshot = get_snapshot(recipe)
+        Recipe.objects.bulk_update(recipes, ['snapshot'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0015_recount_recipe_counters'),
+    ]
+
+    operations = [
+        migrations.RunPython(fill_snapshots, migrations.RunPython.noop),
+    ]
@@ -1,7 +1,10 @@
+import uuid
+
 from django.contrib.auth import get_user_model
 from django.core.validators import MinValueValidator, validate_slug
 from django.db import models
 from django.urls import reverse
+from django.utils import timezone
 
 User = get_user_model()
 
@@ -64,34 +67,12 @@ class Ingredient(models.Model):
         return self.name
 
 
-class RecipeIngredient(models.Model):
-    ingredient = models.ForeignKey(
-        Ingredient,
-        verbose_name='Ингредиент',
-        help_text='Выберите ингредиент',
-        on_delete=models.SET_NULL,
-        null=True,
-    )
-    amount = models.PositiveIntegerField(
-        verbose_name='Количество',
-        help_text='Требуемое количество для рецепта (целое число)',
+class Recipe(models.Model):
+    COMPUTED_FIELDS = (
+        'favorites_count', 'carts_count', 'popular_score', 'trending_score',
+        'snapshot',
     )
 
-    class Meta:
-        verbose_name = 'Ингредиент рецепта'
-        verbose_name_plural = 'Ингредиенты рецепта'
-        constraints = [
-            models.UniqueConstraint(
-                fields=['ingredient', 'amount'],
-                name='Уникальная запись рецепт - количество',
-            )
-        ]
-
-    def __str__(self):
-        return self.ingredient.name
-
-
-class Recipe(models.Model):
     tags = models.ManyToManyField(
         Tag,
         related_name='recipes',
@@ -103,7 +84,8 @@ class Recipe(models.Model):
         on_delete=models.CASCADE,
     )
     ingredients = models.ManyToManyField(
-        RecipeIngredient,
+        Ingredient,
+        through='RecipeIngredient',
         verbose_name='Ингредиенты',
         related_name='recipes',
     )
@@ -117,6 +99,18 @@ class Recipe(models.Model):
         help_text='Загрузите изображение для вашего рецепта',
         upload_to='recipes/images/',
     )
+    thumbnail = models.ImageField(
+        verbose_name='Миниатюра',
+        upload_to='recipes/thumbnails/',
+        blank=True,
+        editable=False,
+    )
+    image_processed = models.BooleanField(
+        verbose_name='Изображение обработано',
+        default=False,
+        editable=False,
+        db_index=True,
+    )
     text = models.TextField(
         verbose_name='Описание',
         help_text='Описание блюда, инструкция по приготовлению, советы и т.д.',
@@ -136,58 +130,267 @@ class Recipe(models.Model):
         auto_now_add=True,
         db_index=True,
     )
+    favorites_count = models.PositiveIntegerField(
+        verbose_name='Добавлений в избранное',
+        default=0,
+        editable=False,
+    )
+    carts_count = models.PositiveIntegerField(
+        verbose_name='Добавлений в корзину',
+        default=0,
+        editable=False,
+    )
+    popular_score = models.FloatField(
+        verbose_name='Популярность',
+        default=0,
+        editable=False,
+    )
+    trending_score = models.FloatField(
+        verbose_name='Популярность за последние дни',
+        default=0,
+        editable=False,
+    )
+    snapshot = models.JSONField(
+        verbose_name='Данные для списка рецептов',
+        default=dict,
+        editable=False,
+    )
 
     class Meta:
-        ordering = ['-pub_date']
+        ordering = ['-pub_date', '-id']
+        indexes = [
+            models.Index(
+                fields=['-pub_date', '-id'],
+                name='recipe_pub_date_id_idx',
+            ),
+            models.Index(
+                fields=['author', '-pub_date', '-id'],
+                name='recipe_author_pub_date_idx',
+            ),
+            models.Index(
+                fields=['-popular_score', '-pub_date', '-id'],
+                name='recipe_popular_idx',
+            ),
+            models.Index(
+                fields=['-trending_score', '-pub_date', '-id'],
+                name='recipe_trending_idx',
+            ),
+        ]
         verbose_name = 'Рецепт'
         verbose_name_plural = 'Рецепты'
 
     def __str__(self):
         return f'{self.name}\n{self.text}'
 
+    def save(self, *args, **kwargs):
+        # Счётчики, оценки и снимок обновляются отдельными запросами, пока
+        # рецепт редактируют: полное сохранение затёрло бы их значениями,
+        # прочитанными в начале запроса
+        if not self._state.adding and kwargs.get('update_fields') is None:
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key
+                and field.name not in self.COMPUTED_FIELDS
+            ]
+        super().save(*args, **kwargs)
+
     def get_absoulute_url(self):
         return reverse('recipe', args=[self.pk])
 
 
+class RecipeIngredient(models.Model):
+    recipe = models.ForeignKey(
+        Recipe,
+        verbose_name='Рецепт',
+        related_name='recipe_ingredients',
+        on_delete=models.CASCADE,
+    )
+    ingredient = models.ForeignKey(
+        Ingredient,
+        verbose_name='Ингредиент',
+        help_text='Выберите ингредиент',
+        related_name='recipe_ingredients',
+        on_delete=models.PROTECT,
+    )
+    amount = models.PositiveIntegerField(
+        verbose_name='Количество',
+        help_text='Требуемое количество для рецепта (целое число)',
+        validators=[
+            MinValueValidator(
+                1,
+                'Количество ингредиента должно быть больше нуля',
+            )
+        ]
+    )
+
+    class Meta:
+        verbose_name = 'Ингредиент рецепта'
+        verbose_name_plural = 'Ингредиенты рецепта'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['recipe', 'ingredient'],
+                name='Уникальная запись рецепт - ингредиент',
+            )
+        ]
+
+    def __str__(self):
+        return self.ingredient.name
+
+
 class Favorite(models.Model):
-    user = models.OneToOneField(
+    counter_field = 'favorites_count'
+
+    user = models.ForeignKey(
         User,
         verbose_name='Пользователь',
         related_name='favorites',
         on_delete=models.CASCADE,
     )
-    recipes = models.ManyToManyField(
+    recipe = models.ForeignKey(
         Recipe,
-        verbose_name='Рецепты',
+        verbose_name='Рецепт',
         related_name='in_favorite',
+        on_delete=models.CASCADE,
+    )
+    created = models.DateTimeField(
+        verbose_name='Дата добавления',
+        default=timezone.now,
+        editable=False,
+        db_index=True,
     )
 
     class Meta:
+        verbose_name = 'Избранный рецепт'
+        verbose_name_plural = 'Избранные рецепты'
         constraints = [
             models.UniqueConstraint(
-                fields=['user'],
-                name='Уникальная запись избранное пользователя',
+                fields=['user', 'recipe'],
+                name='Уникальная запись пользователь - избранный рецепт',
             )
         ]
 
+    def __str__(self):
+        return f'{self.user} добавил в избранное {self.recipe.name}'
+
 
 class ShoppingCart(models.Model):
-    user = models.OneToOneField(
+    counter_field = 'carts_count'
+
+    user = models.ForeignKey(
         User,
         verbose_name='Пользователь',
         related_name='shopping_cart',
         on_delete=models.CASCADE,
     )
-    recipes = models.ManyToManyField(
+    recipe = models.ForeignKey(
         Recipe,
-        verbose_name='Рецепты',
+        verbose_name='Рецепт',
         related_name='in_shopping_carts',
+        on_delete=models.CASCADE,
+    )
+    created = models.DateTimeField(
+        verbose_name='Дата добавления',
+        default=timezone.now,
+        editable=False,
+        db_index=True,
+    )
+
+    class Meta:
+        verbose_name = 'Рецепт в корзине'
+        verbose_name_plural = 'Рецепты в корзине'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'recipe'],
+                name='Уникальная запись пользователь - рецепт в корзине',
+            )
+        ]
+
+    def __str__(self):
+        return f'{self.user} добавил в корзину {self.recipe.name}'
+
+
+class ShoppingListItem(models.Model):
+    user = models.ForeignKey(
+        User,
+        verbose_name='Пользователь',
+        related_name='shopping_list_items',
+        on_delete=models.CASCADE,
+    )
+    ingredient = models.ForeignKey(
+        Ingredient,
+        verbose_name='Ингредиент',
+        related_name='shopping_list_items',
+        on_delete=models.CASCADE,
+    )
+    amount = models.IntegerField(
+        verbose_name='Количество',
     )
 
     class Meta:
+        verbose_name = 'Строка списка покупок'
+        verbose_name_plural = 'Списки покупок'
         constraints = [
             models.UniqueConstraint(
-                fields=['user'],
-                name='Уникальная запись пользовательская корзина',
+                fields=['user', 'ingredient'],
+                name='Уникальная запись пользователь - ингредиент в списке',
+            )
+        ]
+
+    def __str__(self):
+        return f'{self.user}: {self.ingredient} - {self.amount}'
+
+
+class ShoppingListJob(models.Model):
+    class Status(models.TextChoices):
+        PENDING = 'pending', 'В очереди'
+        RUNNING = 'running', 'Выполняется'
+        DONE = 'done', 'Готово'
+        FAILED = 'failed', 'Ошибка'
+
+    id = models.UUIDField(
+        primary_key=True,
+        default=uuid.uuid4,
+        editable=False,
+    )
+    user = models.ForeignKey(
+        User,
+        verbose_name='Пользователь',
+        related_name='shopping_list_jobs',
+        on_delete=models.CASCADE,
+    )
+    rows = models.JSONField(
+        verbose_name='Список покупок',
+    )
+    cache_key = models.CharField(
+        verbose_name='Ключ файла',
+        max_length=64,
+    )
+    status = models.CharField(
+        verbose_name='Статус',
+        max_length=20,
+        choices=Status.choices,
+        default=Status.PENDING,
+    )
+    created = models.DateTimeField(
+        verbose_name='Создано',
+        auto_now_add=True,
+    )
+    finished = models.DateTimeField(
+        verbose_name='Завершено',
+        null=True,
+        blank=True,
+    )
+
+    class Meta:
+        ordering = ['created']
+        verbose_name = 'Задача на список покупок'
+        verbose_name_plural = 'Задачи на список покупок'
+        indexes = [
+            models.Index(
+                fields=['status', 'created'],
+                name='shopping_list_job_queue_idx',
             )
         ]
+
+    def __str__(self):
+        return f'{self.user} {self.get_status_display()}'
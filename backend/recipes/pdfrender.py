@@ -1,8 +1,17 @@
+import hashlib
+import json
+import multiprocessing
 import os
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from io import BytesIO
 
+import django
 from django.conf import settings
 from django.http import HttpResponse
 from django.template.loader import get_template
+from django.utils.cache import get_conditional_response
+from django.utils.http import quote_etag
 from xhtml2pdf import pisa
 
 
@@ -17,16 +26,129 @@ def link_callback(uri, rel):
         return None
 
 
-def render_pdf_view(request, context, path,):
-    template_path = os.path.join(settings.TEMPLATES_DIR, path)
-    response = HttpResponse(content_type='application/pdf')
-    response['Content-Disposition'] = (
-        'attachment; filename="ingredients_list.pdf"'
-    )
-    template = get_template(template_path)
+def get_pdf_template(path):
+    return get_template(os.path.join(settings.TEMPLATES_DIR, path))
+
+
+def get_cache_key(template, context):
+    digest = hashlib.sha256(template.template.source.encode())
+    digest.update(json.dumps(
+        context, ensure_ascii=False, sort_keys=True, default=str,
+    ).encode())
+    return digest.hexdigest()
+
+
+def get_cache_path(key):
+    return os.path.join(settings.PDF_CACHE_DIR, f'{key}.pdf')
+
+
+def has_cached_pdf(key):
+    return os.path.exists(get_cache_path(key))
+
+
+def read_cached_pdf(key):
+    path = get_cache_path(key)
+    try:
+        with open(path, 'rb') as pdf_file:
+            content = pdf_file.read()
+        os.utime(path)
+    except FileNotFoundError:
+        return None
+    return content
+
+
+def evict_cached_pdfs():
+    entries = []
+    with os.scandir(settings.PDF_CACHE_DIR) as cache_dir:
+        for entry in cache_dir:
+            if entry.name.endswith('.pdf'):
+                stat = entry.stat()
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+    total_size = sum(size for _, size, _ in entries)
+    for _, size, path in sorted(entries):
+        if total_size <= settings.PDF_CACHE_MAX_SIZE:
+            break
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        total_size -= size
+
+
+def write_cached_pdf(key, content):
+    os.makedirs(settings.PDF_CACHE_DIR, exist_ok=True)
+    path = get_cache_path(key)
+    temp_path = f'{path}.{os.getpid()}.tmp'
+    with open(temp_path, 'wb') as pdf_file:
+        pdf_file.write(content)
+    os.replace(temp_path, path)
+    evict_cached_pdfs()
+
+
+class PDFRenderError(Exception):
+    def __init__(self, html):
+        super().__init__('PDF rendering failed')
+        self.html = html
+
+
+def render_cached_pdf(template, context, key):
+    content = read_cached_pdf(key)
+    if content is not None:
+        return content
     html = template.render(context)
-    pisa_status = pisa.CreatePDF(html, dest=response,
+    buffer = BytesIO()
+    pisa_status = pisa.CreatePDF(html, dest=buffer,
                                  link_callback=link_callback)
     if pisa_status.err:
-        return HttpResponse('We had some errors <pre>' + html + '</pre>')
+        raise PDFRenderError(html)
+    content = buffer.getvalue()
+    write_cached_pdf(key, content)
+    return content
+
+
+def render_pdf_file(path, context, key):
+    return render_cached_pdf(get_pdf_template(path), context, key)
+
+
+@lru_cache(maxsize=None)
+def get_render_executor():
+    if not settings.PDF_RENDER_WORKERS:
+        return None
+    return ProcessPoolExecutor(
+        max_workers=settings.PDF_RENDER_WORKERS,
+        mp_context=multiprocessing.get_context('spawn'),
+        initializer=django.setup,
+    )
+
+
+def render_pdf(path, context, key):
+    content = read_cached_pdf(key)
+    if content is not None:
+        return content
+    executor = get_render_executor()
+    if executor is None:
+        return render_pdf_file(path, context, key)
+    return executor.submit(render_pdf_file, path, context, key).result()
+
+
+def pdf_response(content, key):
+    response = HttpResponse(content, content_type='application/pdf')
+    response['Content-Disposition'] = (
+        'attachment; filename="ingredients_list.pdf"'
+    )
+    response['ETag'] = quote_etag(key)
+    response['Cache-Control'] = 'private, no-cache'
     return response
+
+
+def render_pdf_view(request, context, path,):
+    template = get_pdf_template(path)
+    key = get_cache_key(template, context)
+    not_modified = get_conditional_response(request, etag=quote_etag(key))
+    if not_modified is not None:
+        return not_modified
+    try:
+        content = render_pdf(path, context, key)
+    except PDFRenderError as error:
+        return HttpResponse('We had some errors <pre>' + error.html + '</pre>')
+    return pdf_response(content, key)
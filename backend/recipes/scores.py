@@ -0,0 +1,83 @@
+import math
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+
+from django.conf import settings
+from django.db.models import Count
+from django.db.models.functions import TruncHour
+
+from recipes.models import Favorite, Recipe, ShoppingCart
+
+SCORE_WEIGHTS = (
+    (Favorite, 1.0),
+    (ShoppingCart, 2.0),
+)
+# Затухание считается не от текущего момента, а от постоянной даты:
+# вклад добавления растёт вдвое за период полураспада. Порядок рецептов
+# такой же, как при затухании от текущего момента, но оценка рецепта
+# меняется только при новых добавлениях, и пересчёт не переписывает все
+# строки. Хранится log2 суммы, иначе числа выходят за пределы float
+SCORE_EPOCH = datetime(2022, 1, 1, tzinfo=timezone.utc)
+SCORE_PRECISION = 6
+
+
+def add_log2(first, second):
+    if first is None:
+        return second
+    high, low = max(first, second), min(first, second)
+    return high + math.log2(1 + 2 ** (low - high))
+
+
+def get_recipe_scores():
+    half_lives = (
+        timedelta(hours=settings.RECIPE_POPULAR_HALF_LIFE),
+        timedelta(hours=settings.RECIPE_TRENDING_HALF_LIFE),
+    )
+    scores = defaultdict(lambda: [None, None])
+    for model, weight in SCORE_WEIGHTS:
+        # Добавления группируются по часам: строк столько, сколько
+        # пар рецепт - час, а не сколько добавлений
+        rows = model.objects.values(
+            'recipe_id', hour=TruncHour('created'),
+        ).annotate(total=Count('pk')).order_by('recipe_id', 'hour')
+        for row in rows.iterator():
+            score = scores[row['recipe_id']]
+            age = row['hour'] - SCORE_EPOCH
+            for index, half_life in enumerate(half_lives):
+                score[index] = add_log2(
+                    score[index],
+                    math.log2(weight * row['total']) + age / half_life,
+                )
+    return {
+        recipe_id: tuple(round(value, SCORE_PRECISION) for value in score)
+        for recipe_id, score in scores.items()
+    }
+
+
+def update_recipe_scores(scores, batch_size):
+    recipes = Recipe.objects.order_by('pk').values_list(
+        'pk', 'popular_score', 'trending_score',
+    )
+    checked = updated = 0
+    last_id = 0
+    while True:
+        batch = list(recipes.filter(pk__gt=last_id)[:batch_size])
+        if not batch:
+            break
+        last_id = batch[-1][0]
+        checked += len(batch)
+        changed = [
+            Recipe(
+                pk=recipe_id,
+                popular_score=scores.get(recipe_id, (0.0, 0.0))[0],
+                trending_score=scores.get(recipe_id, (0.0, 0.0))[1],
+            )
+            for recipe_id, *stored in batch
+            if tuple(stored) != scores.get(recipe_id, (0.0, 0.0))
+        ]
+        if changed:
+            Recipe.objects.bulk_update(
+                changed, ['popular_score', 'trending_score'],
+            )
+            updated += len(changed)
+    return checked, updated
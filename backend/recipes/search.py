@@ -0,0 +1,385 @@
+import bisect
+import heapq
+import re
+import threading
+from array import array
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections, transaction
+from django.db.models import FloatField, IntegerField, Value
+from django.db.models.expressions import RawSQL
+from django.utils.html import escape
+
+from foodgram.caching import get_table_version
+from recipes.models import Recipe, RecipeIngredient
+
+WORD_RE = re.compile(r'\w+')
+# Упрощённый стемминг для индекса в памяти: отбрасываются частые окончания
+ENDINGS = sorted((
+    'иями', 'ями', 'ами', 'ией', 'иям', 'ием', 'иях', 'ого', 'ому', 'его',
+    'ему', 'ыми', 'ими', 'ой', 'ей', 'ий', 'ый', 'ая', 'яя', 'ое', 'ее',
+    'ые', 'ие', 'ов', 'ев', 'ам', 'ям', 'ах', 'ях', 'ом', 'ем', 'ую', 'юю',
+    'ью', 'ия', 'ья', 'а', 'я', 'о', 'е', 'ы', 'и', 'у', 'ю', 'ь', 'й',
+), key=len, reverse=True)
+MIN_STEM_LENGTH = 3
+NAME_WEIGHT = 1.0
+TEXT_WEIGHT = 0.4
+SNIPPET_WORDS = 20
+SNIPPET_CONTEXT = 5
+MAX_INGREDIENTS = 1000
+MAX_CHANGES = 1000
+MAX_PART_FACTOR = 8
+START_SEL = '<b>'
+STOP_SEL = '</b>'
+# ts_headline не экранирует текст, поэтому совпадения отмечаются
+# управляющими символами и заменяются тегами после экранирования
+HEADLINE_START_SEL = '\x02'
+HEADLINE_STOP_SEL = '\x03'
+
+
+def stem(word):
+    word = word.lower().replace('ё', 'е')
+    for ending in ENDINGS:
+        if word.endswith(ending) and (
+            len(word) - len(ending) >= MIN_STEM_LENGTH
+        ):
+            return word[:-len(ending)]
+    return word
+
+
+def get_terms(value):
+    return {stem(word) for word in WORD_RE.findall(value)}
+
+
+def highlight(text, value):
+    terms = get_terms(value)
+    words = list(WORD_RE.finditer(text))
+    if not words:
+        return ''
+    hits = [
+        position for position, word in enumerate(words)
+        if stem(word.group()) in terms
+    ]
+    first = max(0, hits[0] - SNIPPET_CONTEXT) if hits else 0
+    last = min(len(words), first + SNIPPET_WORDS) - 1
+    parts = []
+    end = words[first].start()
+    for position in range(first, last + 1):
+        word = words[position]
+        parts.append(escape(text[end:word.start()]))
+        if position in hits:
+            parts.append(f'{START_SEL}{escape(word.group())}{STOP_SEL}')
+        else:
+            parts.append(escape(word.group()))
+        end = word.end()
+    return ''.join(parts)
+
+
+class RecipeSearchIndex:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.postings = {}
+        self.version = None
+
+    def build(self):
+        postings = defaultdict(lambda: defaultdict(float))
+        for recipe_id, name, text in Recipe.objects.values_list(
+            'id', 'name', 'text'
+        ).iterator():
+            for words, weight in ((name, NAME_WEIGHT), (text, TEXT_WEIGHT)):
+                for word in WORD_RE.findall(words):
+                    postings[stem(word)][recipe_id] += weight
+        return {term: dict(recipes) for term, recipes in postings.items()}
+
+    def get_postings(self):
+        version = get_table_version(Recipe)
+        if self.version != version:
+            with self.lock:
+                if self.version != version:
+                    self.postings = self.build()
+                    self.version = version
+        return self.postings
+
+    def search(self, value, limit=None):
+        postings = self.get_postings()
+        matches = sorted(
+            (postings.get(term, {}) for term in get_terms(value)), key=len,
+        )
+        if not matches:
+            return []
+        ranks = {
+            recipe_id: sum(match[recipe_id] for match in matches)
+            for recipe_id in matches[0]
+            if all(recipe_id in match for match in matches[1:])
+        }
+        return sorted(
+            ranks.items(), key=lambda item: (-item[1], -item[0]),
+        )[:limit]
+
+
+recipe_search_index = RecipeSearchIndex()
+
+
+def get_changes_key(version, number):
+    return f'recipe-ingredients:{version}:{number}'
+
+
+def get_sequence_key(version):
+    return f'recipe-ingredients:{version}:sequence'
+
+
+def record_recipe_changes(recipe_ids):
+    recipe_ids = list(recipe_ids)
+
+    def record():
+        version, _ = get_table_version(RecipeIngredient)
+        key = get_sequence_key(version)
+        cache.add(key, 0, timeout=None)
+        number = cache.incr(key)
+        cache.set(
+            get_changes_key(version, number), recipe_ids,
+            settings.RESPONSE_CACHE_TIMEOUT,
+        )
+
+    if recipe_ids:
+        transaction.on_commit(record)
+
+
+def get_coverage_key(result):
+    # Сначала рецепты с наибольшим числом имеющихся ингредиентов,
+    # затем те, для которых докупать придётся меньше
+    recipe_id, matched, missing = result
+    return -matched, missing, -recipe_id
+
+
+class RecipeIngredientIndex:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.postings = {}
+        self.recipes = {}
+        self.version = None
+        self.sequence = 0
+
+    def add(self, recipe_id, ingredient_ids):
+        self.recipes[recipe_id] = ingredient_ids
+        for ingredient_id in ingredient_ids:
+            recipe_ids = self.postings.setdefault(ingredient_id, array('q'))
+            recipe_ids.insert(bisect.bisect_left(recipe_ids, recipe_id),
+                              recipe_id)
+
+    def remove(self, recipe_id):
+        for ingredient_id in self.recipes.pop(recipe_id, ()):
+            recipe_ids = self.postings[ingredient_id]
+            position = bisect.bisect_left(recipe_ids, recipe_id)
+            if position < len(recipe_ids) and (
+                recipe_ids[position] == recipe_id
+            ):
+                recipe_ids.pop(position)
+
+    def load(self, recipe_ids=None):
+        rows = RecipeIngredient.objects.order_by('recipe_id', 'ingredient_id')
+        if recipe_ids is not None:
+            rows = rows.filter(recipe_id__in=recipe_ids)
+        recipes = defaultdict(list)
+        for recipe_id, ingredient_id in rows.values_list(
+            'recipe_id', 'ingredient_id'
+        ).iterator():
+            recipes[recipe_id].append(ingredient_id)
+        return recipes
+
+    def build(self):
+        postings = defaultdict(lambda: array('q'))
+        recipes = {}
+        for recipe_id, ingredient_ids in self.load().items():
+            recipes[recipe_id] = tuple(ingredient_ids)
+            for ingredient_id in ingredient_ids:
+                postings[ingredient_id].append(recipe_id)
+        self.postings = dict(postings)
+        self.recipes = recipes
+
+    def refresh(self, recipe_ids):
+        recipes = self.load(recipe_ids)
+        for recipe_id in recipe_ids:
+            self.remove(recipe_id)
+            if recipe_id in recipes:
+                self.add(recipe_id, tuple(recipes[recipe_id]))
+
+    def get_changes(self, version, sequence):
+        if sequence < self.sequence or (
+            sequence - self.sequence > MAX_CHANGES
+        ):
+            return None
+        changes = cache.get_many([
+            get_changes_key(version, number)
+            for number in range(self.sequence + 1, sequence + 1)
+        ])
+        if len(changes) < sequence - self.sequence:
+            return None
+        return {
+            recipe_id for recipe_ids in changes.values()
+            for recipe_id in recipe_ids
+        }
+
+    def get_state(self):
+        version, _ = get_table_version(RecipeIngredient)
+        return version, cache.get(get_sequence_key(version)) or 0
+
+    def sync(self):
+        if (self.version, self.sequence) == self.get_state():
+            return
+        with self.lock:
+            version, sequence = self.get_state()
+            if (self.version, self.sequence) == (version, sequence):
+                return
+            changes = None
+            if self.version == version:
+                changes = self.get_changes(version, sequence)
+            # Изменения, которых уже нет в кэше, или массовая загрузка
+            # (смена версии таблицы) требуют полной перестройки
+            if changes is None:
+                self.build()
+            else:
+                self.refresh(sorted(changes))
+            self.version = version
+            self.sequence = sequence
+
+    def search(self, ingredient_ids, limit=None):
+        self.sync()
+        matches = defaultdict(int)
+        for ingredient_id in set(ingredient_ids):
+            for recipe_id in self.postings.get(ingredient_id, ()):
+                matches[recipe_id] += 1
+        results = (
+            (recipe_id, count, len(self.recipes[recipe_id]) - count)
+            for recipe_id, count in matches.items()
+        )
+        if limit is None:
+            return sorted(results, key=get_coverage_key)
+        return heapq.nsmallest(limit, results, key=get_coverage_key)
+
+
+recipe_ingredient_index = RecipeIngredientIndex()
+
+
+def search_postgresql(queryset, value):
+    from django.contrib.postgres.search import (SearchHeadline, SearchQuery,
+                                                SearchRank, SearchVectorField)
+
+    query = SearchQuery(value, config='russian', search_type='websearch')
+    vector = RawSQL(
+        f'{Recipe._meta.db_table}.search_vector', (),
+        output_field=SearchVectorField(),
+    )
+    return queryset.alias(search_vector=vector).filter(
+        search_vector=query,
+    ).annotate(
+        search_rank=SearchRank(vector, query),
+        search_snippet=SearchHeadline(
+            'text', query, config='russian',
+            start_sel=HEADLINE_START_SEL, stop_sel=HEADLINE_STOP_SEL,
+            max_words=SNIPPET_WORDS, min_words=SNIPPET_CONTEXT,
+        ),
+    )
+
+
+def get_rank_expression(groups, default, output_field):
+    # Один RawSQL вместо When(pk__in=...) на каждую группу: Django
+    # разбирает и компилирует такие выражения дольше, чем база их выполняет
+    branches = []
+    params = []
+    for value, recipe_ids in groups.items():
+        branches.append(
+            f'WHEN {Recipe._meta.db_table}.id IN '
+            f'({", ".join(["%s"] * len(recipe_ids))}) THEN %s'
+        )
+        params.extend(recipe_ids)
+        params.append(value)
+    if not branches:
+        return Value(default, output_field=output_field)
+    return RawSQL(
+        f'CASE {" ".join(branches)} ELSE %s END', (*params, default),
+        output_field=output_field,
+    )
+
+
+def search_index(queryset, value):
+    limit = settings.RECIPE_SEARCH_LIMIT
+    if queryset.query.has_filters():
+        results = get_allowed_results(
+            queryset, recipe_search_index.search(value), limit,
+        )
+    else:
+        results = recipe_search_index.search(value, limit)
+    ranks = defaultdict(list)
+    for recipe_id, rank in results:
+        ranks[rank].append(recipe_id)
+    # Оценки складываются из нескольких весов, поэтому различных значений
+    # мало и CASE строится по группам, а не по каждому рецепту
+    return queryset.filter(
+        pk__in=[recipe_id for recipe_id, _ in results],
+    ).annotate(
+        search_rank=get_rank_expression(ranks, 0.0, FloatField()),
+    )
+
+
+def search_recipes(queryset, value):
+    if connections[queryset.db].vendor == 'postgresql':
+        queryset = search_postgresql(queryset, value)
+    else:
+        queryset = search_index(queryset, value)
+    return queryset.order_by('-search_rank', '-pub_date', '-id')
+
+
+def get_allowed_results(queryset, results, limit):
+    # Другие фильтры (автор, теги, избранное) применяются до отсечения по
+    # limit: список просматривается частями растущего размера
+    allowed = []
+    start, size = 0, limit
+    while start < len(results) and len(allowed) < limit:
+        part = results[start:start + size]
+        recipe_ids = set(queryset.filter(
+            pk__in=[item[0] for item in part],
+        ).values_list('pk', flat=True))
+        allowed.extend(item for item in part if item[0] in recipe_ids)
+        start += size
+        size = min(size * 2, limit * MAX_PART_FACTOR)
+    return allowed[:limit]
+
+
+def search_by_ingredients(queryset, ingredient_ids):
+    limit = settings.RECIPE_SEARCH_LIMIT
+    # На один результат больше, чтобы узнать, был ли список обрезан
+    if queryset.query.has_filters():
+        results = get_allowed_results(
+            queryset, recipe_ingredient_index.search(ingredient_ids),
+            limit + 1,
+        )
+    else:
+        results = recipe_ingredient_index.search(ingredient_ids, limit + 1)
+    if len(results) > limit:
+        # Выводятся и считаются все подходящие рецепты; по покрытию
+        # упорядочены первые RECIPE_SEARCH_LIMIT из них, остальные идут
+        # по дате публикации
+        results = results[:limit]
+        recipe_ids = RecipeIngredient.objects.filter(
+            ingredient_id__in=ingredient_ids,
+        ).values('recipe_id')
+    else:
+        recipe_ids = [recipe_id for recipe_id, _, _ in results]
+    scores = defaultdict(list)
+    for recipe_id, matched, missing in results:
+        scores[matched * MAX_INGREDIENTS - missing].append(recipe_id)
+    return queryset.filter(pk__in=recipe_ids).annotate(
+        ingredients_score=get_rank_expression(scores, 0, IntegerField()),
+    ).order_by('-ingredients_score', '-pub_date', '-id')
+
+
+def get_search_snippet(recipe, value):
+    snippet = getattr(recipe, 'search_snippet', None)
+    if snippet is None:
+        return highlight(recipe.text, value)
+    return escape(snippet).replace(
+        HEADLINE_START_SEL, START_SEL,
+    ).replace(HEADLINE_STOP_SEL, STOP_SEL)
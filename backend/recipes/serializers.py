@@ -1,11 +1,17 @@
-from django.shortcuts import get_object_or_404
-from drf_extra_fields.fields import Base64ImageField
+from django.db import transaction
+from django.db.models import Prefetch, prefetch_related_objects
 from rest_framework import serializers
 from rest_framework.exceptions import ValidationError
 
-from recipes.models import (Favorite, Ingredient, Recipe, RecipeIngredient,
-                            ShoppingCart, Tag)
+from recipes.fields import Base64ImageField, PreviewImageField
+from recipes.models import (Ingredient, Recipe, RecipeIngredient,
+                            ShoppingListJob, Tag)
+from recipes.search import get_search_snippet, record_recipe_changes
+from recipes.shopping_list import (change_recipe_in_shopping_lists,
+                                   get_amounts_delta)
+from users.models import User
 from users.serializers import UserSerializer
+from users.viewer import Viewer
 
 
 class TagSerializer(serializers.ModelSerializer):
@@ -49,6 +55,8 @@ class RecipeIngredientSerializer(serializers.ModelSerializer):
 
 
 class CreateRecipeIngredientSerializer(serializers.ModelSerializer):
+    id = serializers.IntegerField(source='ingredient_id')
+
     class Meta:
         model = RecipeIngredient
         fields = [
@@ -56,12 +64,6 @@ class CreateRecipeIngredientSerializer(serializers.ModelSerializer):
             'amount',
         ]
         extra_kwargs = {
-            'id': {
-                'read_only': False,
-                'error_messages': {
-                    'does_not_exist': 'Ингредиент не был найден',
-                }
-            },
             'amount': {
                 'error_messages': {
                     'min_value': 'Минимальное  количество ингредиента 1'
@@ -73,7 +75,10 @@ class CreateRecipeIngredientSerializer(serializers.ModelSerializer):
 class RecipeSerializer(serializers.ModelSerializer):
     tags = TagSerializer(many=True)
     author = UserSerializer()
-    ingredients = RecipeIngredientSerializer(many=True)
+    ingredients = RecipeIngredientSerializer(
+        many=True,
+        source='recipe_ingredients',
+    )
     is_favorited = serializers.SerializerMethodField()
     is_in_shopping_cart = serializers.SerializerMethodField()
 
@@ -92,34 +97,117 @@ class RecipeSerializer(serializers.ModelSerializer):
             'cooking_time',
         ]
 
-    def get_user(self):
-        return self.context['request'].user
+    def get_is_favorited(self, obj):
+        return obj.pk in Viewer.from_context(self.context).favorite_ids
+
+    def get_is_in_shopping_cart(self, obj):
+        return obj.pk in Viewer.from_context(self.context).shopping_cart_ids
+
+
+class AuthorSnapshotSerializer(serializers.ModelSerializer):
+
+    class Meta:
+        model = User
+        fields = [
+            'email',
+            'id',
+            'username',
+            'first_name',
+            'last_name',
+        ]
+
+
+class RecipeSnapshotSerializer(serializers.ModelSerializer):
+    tags = TagSerializer(many=True)
+    author = AuthorSnapshotSerializer()
+    ingredients = RecipeIngredientSerializer(
+        many=True,
+        source='recipe_ingredients',
+    )
+
+    class Meta:
+        model = Recipe
+        fields = [
+            'tags',
+            'author',
+            'ingredients',
+        ]
+
+    @staticmethod
+    def get_prefetch():
+        return (
+            'tags',
+            Prefetch(
+                'recipe_ingredients',
+                queryset=RecipeIngredient.objects.select_related('ingredient'),
+            ),
+        )
+
+    @classmethod
+    def refresh(cls, recipes):
+        prefetch_related_objects(recipes, 'author', *cls.get_prefetch())
+        for recipe in recipes:
+            recipe.snapshot = cls(recipe).data
+        Recipe.objects.bulk_update(recipes, ['snapshot'])
+
+    @classmethod
+    def refresh_queryset(cls, queryset, batch_size=500):
+        ids = list(queryset.order_by().values_list('pk', flat=True))
+        for start in range(0, len(ids), batch_size):
+            cls.refresh(list(
+                Recipe.objects.filter(pk__in=ids[start:start + batch_size])
+            ))
+
+
+class RecipeListSerializer(serializers.ModelSerializer):
+    tags = serializers.SerializerMethodField()
+    author = serializers.SerializerMethodField()
+    ingredients = serializers.SerializerMethodField()
+    is_favorited = serializers.SerializerMethodField()
+    is_in_shopping_cart = serializers.SerializerMethodField()
+    image = PreviewImageField()
+
+    class Meta:
+        model = Recipe
+        fields = RecipeSerializer.Meta.fields
+
+    def get_snapshot(self, obj):
+        if not obj.snapshot:
+            obj.snapshot = RecipeSnapshotSerializer(obj).data
+        return obj.snapshot
+
+    def get_tags(self, obj):
+        return self.get_snapshot(obj)['tags']
+
+    def get_author(self, obj):
+        author = self.get_snapshot(obj)['author']
+        viewer = Viewer.from_context(self.context)
+        return {
+            **author,
+            'is_subscribed': author['id'] in viewer.subscription_ids,
+        }
+
+    def get_ingredients(self, obj):
+        return self.get_snapshot(obj)['ingredients']
 
     def get_is_favorited(self, obj):
-        user = self.get_user()
-        if not user.is_authenticated:
-            return False
-        if not Favorite.objects.filter(user=user).exists():
-            return False
-        return user.favorites.recipes.filter(pk__in=(obj.pk,)).exists()
+        return obj.pk in Viewer.from_context(self.context).favorite_ids
 
     def get_is_in_shopping_cart(self, obj):
-        user = self.get_user()
-        if not user.is_authenticated:
-            return False
-        if not ShoppingCart.objects.filter(user=user).exists():
-            return False
-        return user.shopping_cart.recipes.filter(pk__in=(obj.pk,)).exists()
+        return obj.pk in Viewer.from_context(self.context).shopping_cart_ids
+
+    def to_representation(self, instance):
+        data = super().to_representation(instance)
+        request = self.context.get('request')
+        search = request.query_params.get('search') if request else None
+        if search and search.strip():
+            data['search_snippet'] = get_search_snippet(instance, search)
+        return data
 
 
 class CreateRecipeSerializer(serializers.ModelSerializer):
     ingredients = CreateRecipeIngredientSerializer(many=True)
-    tags = serializers.ListField(
-        child=serializers.SlugRelatedField(
-            slug_field='id',
-            queryset=Tag.objects.all(),
-        )
-    )
+    tags = serializers.ListField(child=serializers.IntegerField())
     image = Base64ImageField()
 
     class Meta:
@@ -140,6 +228,24 @@ class CreateRecipeSerializer(serializers.ModelSerializer):
             }
         }
 
+    def validate_tags(self, tags):
+        found = set(
+            Tag.objects.filter(pk__in=tags).values_list('pk', flat=True)
+        )
+        if set(tags) - found:
+            raise ValidationError('Тег не был найден')
+        return tags
+
+    def validate_ingredients(self, ingredients):
+        id_ingredients = {item['ingredient_id'] for item in ingredients}
+        found = set(
+            Ingredient.objects.filter(pk__in=id_ingredients)
+            .values_list('pk', flat=True)
+        )
+        if id_ingredients - found:
+            raise ValidationError('Ингредиент не был найден')
+        return ingredients
+
     def validate(self, data):
         if data['cooking_time'] < 1:
             raise ValidationError(
@@ -157,40 +263,95 @@ class CreateRecipeSerializer(serializers.ModelSerializer):
                 raise ValidationError(
                     'Количество ингредиента должно быть больше нуля'
                 )
-            id_ingredients.append(ingredient['id'])
+            id_ingredients.append(ingredient['ingredient_id'])
         if len(id_ingredients) > len(set(id_ingredients)):
             raise ValidationError('Ингредиенты не могут повторяться')
         return data
 
-    def add_ingredients_and_tags(self, instance, validated_data):
-        ingredients, tags = (
-            validated_data.pop('ingredients'), validated_data.pop('tags')
-        )
-        for ingredient in ingredients:
-            count_of_ingredient, _ = RecipeIngredient.objects.get_or_create(
-                ingredient=get_object_or_404(Ingredient, pk=ingredient['id']),
-                amount=ingredient['amount'],
+    def set_ingredients(self, recipe, ingredients, created=False):
+        amounts = {
+            item['ingredient_id']: item['amount'] for item in ingredients
+        }
+        current = {} if created else {
+            item.ingredient_id: item
+            for item in recipe.recipe_ingredients.all()
+        }
+        before = {
+            ingredient_id: item.amount
+            for ingredient_id, item in current.items()
+        }
+        removed = current.keys() - amounts.keys()
+        if removed:
+            RecipeIngredient.objects.filter(
+                recipe=recipe,
+                ingredient_id__in=removed,
+            ).delete()
+        changed = []
+        for ingredient_id, item in current.items():
+            amount = amounts.get(ingredient_id)
+            if amount is not None and item.amount != amount:
+                item.amount = amount
+                changed.append(item)
+        if changed:
+            RecipeIngredient.objects.bulk_update(changed, ['amount'])
+        RecipeIngredient.objects.bulk_create([
+            RecipeIngredient(
+                recipe=recipe,
+                ingredient_id=ingredient_id,
+                amount=amount,
             )
-            instance.ingredients.add(count_of_ingredient)
-        for tag in tags:
-            instance.tags.add(tag)
-        return instance
+            for ingredient_id, amount in amounts.items()
+            if ingredient_id not in current
+        ])
+        if not created:
+            change_recipe_in_shopping_lists(
+                recipe.pk, get_amounts_delta(before, amounts)
+            )
+        if before != amounts:
+            record_recipe_changes([recipe.pk])
 
+    @transaction.atomic
     def create(self, validated_data):
-        saved = {}
-        saved['ingredients'] = validated_data.pop('ingredients')
-        saved['tags'] = validated_data.pop('tags')
+        ingredients = validated_data.pop('ingredients')
+        tags = validated_data.pop('tags')
         recipe = Recipe.objects.create(**validated_data)
-        return self.add_ingredients_and_tags(recipe, saved)
+        self.set_ingredients(recipe, ingredients, created=True)
+        recipe.tags.add(*tags)
+        RecipeSnapshotSerializer.refresh([recipe])
+        return recipe
 
+    @transaction.atomic
     def update(self, instance, validated_data):
-        instance.ingredients.clear()
-        instance.tags.clear()
-        instance = self.add_ingredients_and_tags(instance, validated_data)
-        return super().update(instance, validated_data)
+        ingredients = validated_data.pop('ingredients', None)
+        tags = validated_data.pop('tags', None)
+        if 'image' in validated_data:
+            validated_data['image_processed'] = False
+            instance.thumbnail.delete(save=False)
+        if ingredients is not None:
+            self.set_ingredients(instance, ingredients)
+        if tags is not None:
+            instance.tags.set(tags)
+        instance = super().update(instance, validated_data)
+        RecipeSnapshotSerializer.refresh([instance])
+        return instance
 
     def to_representation(self, instance):
+        prefetch_related_objects(
+            [instance], *RecipeSnapshotSerializer.get_prefetch()
+        )
         request = self.context.get('request')
         context = {'request': request}
         return RecipeSerializer(
             instance, context=context).data
+
+
+class ShoppingListJobSerializer(serializers.ModelSerializer):
+
+    class Meta:
+        model = ShoppingListJob
+        fields = [
+            'id',
+            'status',
+            'created',
+            'finished',
+        ]
@@ -0,0 +1,186 @@
+import csv
+import json
+from contextlib import contextmanager
+
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import Case, F, IntegerField, Sum, Value, When
+from django.http import StreamingHttpResponse
+
+from recipes.models import RecipeIngredient, ShoppingCart, ShoppingListItem
+from recipes.units import ingredient_units
+
+User = get_user_model()
+
+FIELDS = ('name', 'measurement_unit', 'total')
+
+
+def get_shopping_list(user):
+    return ingredient_units.aggregate(
+        ShoppingListItem.objects.filter(user=user)
+        .values_list('ingredient_id', 'amount')
+    )
+
+
+def get_recipe_amounts(recipe_id):
+    return dict(
+        RecipeIngredient.objects.filter(recipe_id=recipe_id)
+        .values_list('ingredient_id', 'amount')
+    )
+
+
+def get_amounts_delta(before, after):
+    return {
+        ingredient_id: after.get(ingredient_id, 0) - before.get(
+            ingredient_id, 0
+        )
+        for ingredient_id in before.keys() | after.keys()
+    }
+
+
+@transaction.atomic
+def change_shopping_lists(user_ids, deltas):
+    deltas = {
+        ingredient_id: delta
+        for ingredient_id, delta in deltas.items() if delta
+    }
+    user_ids = sorted(set(user_ids))
+    if not deltas or not user_ids:
+        return
+    # Строки пользователя блокируются, чтобы параллельные добавления
+    # в корзину не вставили одну и ту же строку списка дважды
+    list(
+        User.objects.select_for_update(no_key=True)
+        .filter(pk__in=user_ids)
+        .order_by('pk')
+        .values_list('pk', flat=True)
+    )
+    items = ShoppingListItem.objects.filter(
+        user_id__in=user_ids, ingredient_id__in=deltas,
+    )
+    existing = set(items.values_list('user_id', 'ingredient_id'))
+    if existing:
+        items.update(amount=F('amount') + Case(
+            *(
+                When(ingredient_id=ingredient_id, then=Value(delta))
+                for ingredient_id, delta in deltas.items()
+            ),
+            output_field=IntegerField(),
+        ))
+    ShoppingListItem.objects.bulk_create([
+        ShoppingListItem(
+            user_id=user_id, ingredient_id=ingredient_id, amount=delta,
+        )
+        for user_id in user_ids
+        for ingredient_id, delta in deltas.items()
+        if delta > 0 and (user_id, ingredient_id) not in existing
+    ])
+    if any(delta < 0 for delta in deltas.values()):
+        items.filter(amount__lte=0).delete()
+
+
+def add_recipe_to_shopping_list(user_id, recipe_id, sign=1):
+    change_shopping_lists([user_id], {
+        ingredient_id: sign * amount
+        for ingredient_id, amount in get_recipe_amounts(recipe_id).items()
+    })
+
+
+def change_recipe_in_shopping_lists(recipe_id, deltas):
+    if any(deltas.values()):
+        change_shopping_lists(
+            ShoppingCart.objects.filter(recipe_id=recipe_id)
+            .values_list('user_id', flat=True),
+            deltas,
+        )
+
+
+@contextmanager
+def track_shopping_lists(recipe_ids):
+    before = {
+        recipe_id: get_recipe_amounts(recipe_id) for recipe_id in recipe_ids
+    }
+    yield
+    for recipe_id, amounts in before.items():
+        change_recipe_in_shopping_lists(
+            recipe_id,
+            get_amounts_delta(amounts, get_recipe_amounts(recipe_id)),
+        )
+
+
+def get_shopping_list_totals(user_ids):
+    totals = {}
+    rows = (
+        RecipeIngredient.objects
+        .filter(recipe__in_shopping_carts__user__in=user_ids)
+        .values('ingredient', user=F('recipe__in_shopping_carts__user'))
+        .annotate(total=Sum('amount'))
+        .order_by()
+    )
+    for row in rows:
+        totals[row['user'], row['ingredient']] = row['total']
+    return totals
+
+
+def get_stored_shopping_lists(user_ids):
+    return {
+        (user_id, ingredient_id): amount
+        for user_id, ingredient_id, amount in ShoppingListItem.objects.filter(
+            user_id__in=user_ids
+        ).values_list('user_id', 'ingredient_id', 'amount')
+    }
+
+
+@transaction.atomic
+def rebuild_shopping_lists(user_ids, totals):
+    ShoppingListItem.objects.filter(user_id__in=user_ids).delete()
+    ShoppingListItem.objects.bulk_create([
+        ShoppingListItem(
+            user_id=user_id, ingredient_id=ingredient_id, amount=amount,
+        )
+        for (user_id, ingredient_id), amount in totals.items()
+    ])
+
+
+class Echo:
+    def write(self, value):
+        return value
+
+
+def render_txt(rows):
+    for row in rows:
+        yield '{name} ({measurement_unit}) - {total}\n'.format(**row)
+
+
+def render_csv(rows):
+    writer = csv.writer(Echo())
+    yield writer.writerow(FIELDS)
+    for row in rows:
+        yield writer.writerow([row[field] for field in FIELDS])
+
+
+def render_json(rows):
+    separator = '['
+    for row in rows:
+        yield separator + json.dumps(row, ensure_ascii=False)
+        separator = ','
+    yield '[]' if separator == '[' else ']'
+
+
+EXPORT_FORMATS = {
+    'txt': ('text/plain', render_txt),
+    'csv': ('text/csv', render_csv),
+    'json': ('application/json', render_json),
+}
+
+
+def stream_shopping_list(rows, export_format):
+    content_type, render = EXPORT_FORMATS[export_format]
+    response = StreamingHttpResponse(
+        render(rows),
+        content_type=f'{content_type}; charset=utf-8',
+    )
+    response['Content-Disposition'] = (
+        f'attachment; filename="ingredients_list.{export_format}"'
+    )
+    return response
@@ -0,0 +1,98 @@
+from django.db.models import F
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from foodgram.caching import bump_table_version
+from recipes.models import Favorite, Ingredient, Recipe, ShoppingCart, Tag
+from recipes.search import record_recipe_changes
+from recipes.serializers import (AuthorSnapshotSerializer,
+                                 RecipeSnapshotSerializer)
+from recipes.shopping_list import add_recipe_to_shopping_list
+from users.models import User
+
+
+@receiver((post_save, post_delete), sender=Tag)
+@receiver((post_save, post_delete), sender=Ingredient)
+def bump_reference_version(sender, **kwargs):
+    bump_table_version(sender)
+
+
+@receiver((post_save, post_delete), sender=Recipe)
+def bump_recipe_version(sender, **kwargs):
+    update_fields = kwargs.get('update_fields')
+    if update_fields is None or {'name', 'text'} & set(update_fields):
+        bump_table_version(sender)
+
+
+@receiver(post_delete, sender=Recipe)
+def remove_recipe_ingredients(sender, instance, **kwargs):
+    record_recipe_changes([instance.pk])
+
+
+@receiver(post_save, sender=Tag)
+def refresh_tag_snapshots(sender, instance, created, **kwargs):
+    if not created:
+        RecipeSnapshotSerializer.refresh_queryset(
+            Recipe.objects.filter(tags=instance)
+        )
+
+
+@receiver(pre_delete, sender=Tag)
+def collect_tag_recipes(sender, instance, **kwargs):
+    instance.snapshot_recipe_ids = list(
+        Recipe.objects.filter(tags=instance).values_list('pk', flat=True)
+    )
+
+
+@receiver(post_delete, sender=Tag)
+def refresh_deleted_tag_snapshots(sender, instance, **kwargs):
+    RecipeSnapshotSerializer.refresh_queryset(
+        Recipe.objects.filter(pk__in=instance.snapshot_recipe_ids)
+    )
+
+
+@receiver(post_save, sender=Ingredient)
+def refresh_ingredient_snapshots(sender, instance, created, **kwargs):
+    if not created:
+        RecipeSnapshotSerializer.refresh_queryset(
+            Recipe.objects.filter(recipe_ingredients__ingredient=instance)
+        )
+
+
+@receiver(post_save, sender=User)
+def refresh_author_snapshots(sender, instance, created, update_fields,
+                             **kwargs):
+    fields = AuthorSnapshotSerializer.Meta.fields
+    if created or (update_fields and not set(update_fields) & set(fields)):
+        return
+    RecipeSnapshotSerializer.refresh_queryset(instance.recipes.all())
+
+
+@receiver(post_save, sender=Favorite)
+@receiver(post_save, sender=ShoppingCart)
+def increment_recipe_counter(sender, instance, created, **kwargs):
+    if created:
+        Recipe.objects.filter(pk=instance.recipe_id).update(
+            **{sender.counter_field: F(sender.counter_field) + 1}
+        )
+
+
+@receiver(post_delete, sender=Favorite)
+@receiver(post_delete, sender=ShoppingCart)
+def decrement_recipe_counter(sender, instance, **kwargs):
+    Recipe.objects.filter(pk=instance.recipe_id).update(
+        **{sender.counter_field: F(sender.counter_field) - 1}
+    )
+
+
+@receiver(post_save, sender=ShoppingCart)
+def add_to_shopping_list(sender, instance, created, **kwargs):
+    if created:
+        add_recipe_to_shopping_list(instance.user_id, instance.recipe_id)
+
+
+@receiver(pre_delete, sender=ShoppingCart)
+def remove_from_shopping_list(sender, instance, **kwargs):
+    add_recipe_to_shopping_list(
+        instance.user_id, instance.recipe_id, sign=-1,
+    )
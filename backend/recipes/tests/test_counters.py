@@ -0,0 +1,66 @@
+from django.test import TestCase
+
+from recipes.models import Favorite, Ingredient, Recipe, ShoppingCart, Tag
+from recipes.serializers import CreateRecipeSerializer
+from users.models import User
+
+
+class RecipeCountersTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            email='user@example.com',
+            username='user',
+            first_name='Имя',
+            last_name='Фамилия',
+            password='password',
+        )
+        cls.tag = Tag.objects.create(name='Тег', color='#000000', slug='tag')
+        cls.ingredient = Ingredient.objects.create(
+            name='Соль', measurement_unit='г',
+        )
+
+    def setUp(self):
+        self.recipe = Recipe.objects.create(
+            author=self.user,
+            name='Рецепт',
+            text='Описание',
+            cooking_time=10,
+            image='recipes/images/test.jpg',
+        )
+
+    def assertCounters(self, favorites_count, carts_count):
+        self.assertEqual(
+            Recipe.objects.values_list(
+                'favorites_count', 'carts_count',
+            ).get(pk=self.recipe.pk),
+            (favorites_count, carts_count),
+        )
+
+    def test_update_keeps_counters(self):
+        # Рецепт прочитан до добавлений, сохранён после них
+        Favorite.objects.create(user=self.user, recipe=self.recipe)
+        ShoppingCart.objects.create(user=self.user, recipe=self.recipe)
+        serializer = CreateRecipeSerializer(
+            self.recipe,
+            data={
+                'name': 'Новое название',
+                'text': 'Описание',
+                'cooking_time': 10,
+                'tags': [self.tag.pk],
+                'ingredients': [{'id': self.ingredient.pk, 'amount': 1}],
+            },
+            partial=True,
+        )
+        serializer.is_valid(raise_exception=True)
+        serializer.save()
+        self.assertCounters(1, 1)
+        self.assertEqual(
+            Recipe.objects.get(pk=self.recipe.pk).name, 'Новое название',
+        )
+
+    def test_save_keeps_counters(self):
+        Favorite.objects.create(user=self.user, recipe=self.recipe)
+        self.recipe.cooking_time = 20
+        self.recipe.save()
+        self.assertCounters(1, 0)
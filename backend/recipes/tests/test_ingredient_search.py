@@ -0,0 +1,99 @@
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+
+from recipes.models import Ingredient, Recipe, RecipeIngredient
+from recipes.serializers import RecipeSnapshotSerializer
+from users.models import User
+
+RECIPES = (
+    (0, 'a'),
+    (0, 'ab'),
+    (1, 'abc'),
+    (1, 'ad'),
+    (0, 'abd'),
+    (1, 'd'),
+)
+
+
+class IngredientSearchTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.users = [
+            User.objects.create_user(
+                email=f'user{number}@example.com',
+                username=f'user{number}',
+                first_name='Имя',
+                last_name='Фамилия',
+                password='password',
+            )
+            for number in range(2)
+        ]
+        cls.ingredients = {
+            name: Ingredient.objects.create(name=name, measurement_unit='г')
+            for name in 'abcd'
+        }
+        recipes = []
+        for number, (author, names) in enumerate(RECIPES):
+            recipe = Recipe.objects.create(
+                author=cls.users[author],
+                name=f'Рецепт {number}',
+                text='Описание',
+                cooking_time=10,
+                image='recipes/images/test.jpg',
+            )
+            RecipeIngredient.objects.bulk_create([
+                RecipeIngredient(
+                    recipe=recipe, ingredient=cls.ingredients[name], amount=1,
+                )
+                for name in names
+            ])
+            recipes.append(recipe)
+        RecipeSnapshotSerializer.refresh(recipes)
+        cls.recipes = [recipe.pk for recipe in recipes]
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+
+    def search(self, query=''):
+        ids = ','.join(
+            str(self.ingredients[name].pk) for name in 'ab'
+        )
+        response = self.client.get(
+            f'/api/recipes/?ingredients={ids}&limit=10{query}'
+        )
+        self.assertEqual(response.status_code, 200)
+        return (
+            [recipe['id'] for recipe in response.data['results']],
+            response.data['count'],
+        )
+
+    def expected(self, *numbers):
+        return [self.recipes[number] for number in numbers]
+
+    def test_ranked_by_coverage(self):
+        self.assertEqual(
+            self.search(), (self.expected(1, 4, 2, 0, 3), 5),
+        )
+
+    @override_settings(RECIPE_SEARCH_LIMIT=3)
+    def test_limit_keeps_all_matches(self):
+        self.assertEqual(
+            self.search(), (self.expected(1, 4, 2, 3, 0), 5),
+        )
+
+    @override_settings(RECIPE_SEARCH_LIMIT=1)
+    def test_filters_apply_before_limit(self):
+        self.assertEqual(
+            self.search(f'&author={self.users[1].pk}'),
+            (self.expected(2, 3), 2),
+        )
+
+    def test_invalid_ids(self):
+        for value in ('1,abc', '²', '-1'):
+            with self.subTest(value=value):
+                response = self.client.get(
+                    f'/api/recipes/?ingredients={value}'
+                )
+                self.assertEqual(response.status_code, 400)
@@ -0,0 +1,112 @@
+from django.core.cache import cache
+from django.test import TestCase
+from rest_framework.test import APIClient
+
+from recipes.models import (Favorite, Ingredient, Recipe, RecipeIngredient,
+                            ShoppingCart, Tag)
+from recipes.serializers import RecipeSnapshotSerializer
+from users.models import Subscription, User
+
+# Количество рецептов, тегов и ингредиентов на странице не меняет число
+# запросов: список читается из snapshot, данные пользователя - тремя
+# запросами (подписки, избранное, корзина)
+LIST_QUERIES = 2
+DETAIL_QUERIES = 3
+VIEWER_QUERIES = 3
+
+
+class RecipeQueriesTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        users = [
+            User.objects.create_user(
+                email=f'user{number}@example.com',
+                username=f'user{number}',
+                first_name='Имя',
+                last_name='Фамилия',
+                password='password',
+            )
+            for number in range(3)
+        ]
+        cls.user = users[0]
+        tags = [
+            Tag.objects.create(
+                name=f'Тег {number}', color=f'#00000{number}',
+                slug=f'tag{number}',
+            )
+            for number in range(3)
+        ]
+        ingredients = [
+            Ingredient.objects.create(
+                name=f'Ингредиент {number}', measurement_unit='г',
+            )
+            for number in range(10)
+        ]
+        recipes = []
+        for number in range(120):
+            recipe = Recipe.objects.create(
+                author=users[number % 3],
+                name=f'Рецепт {number}',
+                text='Описание',
+                cooking_time=10,
+                image='recipes/images/test.jpg',
+            )
+            recipe.tags.add(*tags[:number % 3 + 1])
+            RecipeIngredient.objects.bulk_create([
+                RecipeIngredient(
+                    recipe=recipe, ingredient=ingredient, amount=number + 1,
+                )
+                for ingredient in ingredients[:number % 10 + 1]
+            ])
+            recipes.append(recipe)
+        for recipe in recipes[:50]:
+            Favorite.objects.create(user=cls.user, recipe=recipe)
+            ShoppingCart.objects.create(user=cls.user, recipe=recipe)
+        Subscription.objects.create(subscriber=cls.user, subscription=users[1])
+        RecipeSnapshotSerializer.refresh(recipes)
+        cls.recipe = recipes[0]
+
+    def setUp(self):
+        cache.clear()
+        self.anonymous = APIClient()
+        self.authorized = APIClient()
+        self.authorized.force_authenticate(self.user)
+
+    def assert_queries(self, client, url, count):
+        client.get(url)
+        with self.assertNumQueries(count):
+            response = client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return response
+
+    def test_list_anonymous(self):
+        for limit in (6, 100):
+            with self.subTest(limit=limit):
+                response = self.assert_queries(
+                    self.anonymous, f'/api/recipes/?limit={limit}',
+                    LIST_QUERIES,
+                )
+                self.assertEqual(len(response.data['results']), limit)
+
+    def test_list_authorized(self):
+        for limit in (6, 100):
+            with self.subTest(limit=limit):
+                response = self.assert_queries(
+                    self.authorized, f'/api/recipes/?limit={limit}',
+                    LIST_QUERIES + VIEWER_QUERIES,
+                )
+                self.assertEqual(len(response.data['results']), limit)
+
+    def test_detail_anonymous(self):
+        self.assert_queries(
+            self.anonymous, f'/api/recipes/{self.recipe.pk}/',
+            DETAIL_QUERIES,
+        )
+
+    def test_detail_authorized(self):
+        response = self.assert_queries(
+            self.authorized, f'/api/recipes/{self.recipe.pk}/',
+            DETAIL_QUERIES + VIEWER_QUERIES,
+        )
+        self.assertTrue(response.data['is_favorited'])
+        self.assertTrue(response.data['is_in_shopping_cart'])
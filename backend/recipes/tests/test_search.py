@@ -0,0 +1,73 @@
+from django.core.cache import cache
+from django.test import SimpleTestCase, TestCase, override_settings
+from rest_framework.test import APIClient
+
+from recipes.models import Recipe
+from recipes.search import (HEADLINE_START_SEL, HEADLINE_STOP_SEL,
+                            get_search_snippet, highlight)
+from recipes.serializers import RecipeSnapshotSerializer
+from users.models import User
+
+TEXT = 'Борщ <img src=x onerror=alert(1)> & сметана'
+SNIPPET = '<b>Борщ</b> &lt;img src=x onerror=alert(1)&gt; &amp; сметана'
+
+
+class SnippetTest(SimpleTestCase):
+    def test_highlight_escapes_text(self):
+        self.assertEqual(highlight(TEXT, 'борщ'), SNIPPET)
+
+    def test_headline_escapes_text(self):
+        recipe = Recipe(text=TEXT)
+        recipe.search_snippet = TEXT.replace(
+            'Борщ', f'{HEADLINE_START_SEL}Борщ{HEADLINE_STOP_SEL}',
+        )
+        self.assertEqual(get_search_snippet(recipe, 'борщ'), SNIPPET)
+
+
+class RecipeSearchTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.users = [
+            User.objects.create_user(
+                email=f'user{number}@example.com',
+                username=f'user{number}',
+                first_name='Имя',
+                last_name='Фамилия',
+                password='password',
+            )
+            for number in range(2)
+        ]
+        # Совпадение в названии весит больше: первый рецепт выше второго
+        cls.recipes = [
+            Recipe.objects.create(
+                author=author,
+                name=name,
+                text=TEXT,
+                cooking_time=10,
+                image='recipes/images/test.jpg',
+            )
+            for author, name in zip(cls.users, ('Борщ', 'Суп'))
+        ]
+        RecipeSnapshotSerializer.refresh(cls.recipes)
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+
+    def search(self, query=''):
+        response = self.client.get(f'/api/recipes/?search=борщ{query}')
+        self.assertEqual(response.status_code, 200)
+        return response.data['results']
+
+    def test_snippet_is_escaped(self):
+        self.assertEqual(self.search()[0]['search_snippet'], SNIPPET)
+
+    @override_settings(RECIPE_SEARCH_LIMIT=1)
+    def test_filters_apply_before_limit(self):
+        self.assertEqual(
+            [
+                recipe['id']
+                for recipe in self.search(f'&author={self.users[1].pk}')
+            ],
+            [self.recipes[1].pk],
+        )
@@ -0,0 +1,107 @@
+import random
+
+from django.test import TestCase
+from rest_framework.test import APIClient
+
+from recipes.models import Ingredient, Recipe, RecipeIngredient, Tag
+from recipes.shopping_list import (get_shopping_list_totals,
+                                   get_stored_shopping_lists)
+from users.models import User
+
+STEPS = 200
+
+
+class ShoppingListAggregateTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.users = [
+            User.objects.create_user(
+                email=f'user{number}@example.com',
+                username=f'user{number}',
+                first_name='Имя',
+                last_name='Фамилия',
+                password='password',
+            )
+            for number in range(3)
+        ]
+        cls.tag = Tag.objects.create(name='Тег', color='#000000', slug='tag')
+        cls.ingredients = [
+            Ingredient.objects.create(
+                name=f'Ингредиент {number}', measurement_unit='г',
+            )
+            for number in range(8)
+        ]
+        cls.recipes = []
+        for number in range(6):
+            recipe = Recipe.objects.create(
+                author=cls.users[number % 3],
+                name=f'Рецепт {number}',
+                text='Описание',
+                cooking_time=10,
+                image='recipes/images/test.jpg',
+            )
+            RecipeIngredient.objects.bulk_create([
+                RecipeIngredient(
+                    recipe=recipe, ingredient=ingredient, amount=number + 1,
+                )
+                for ingredient in cls.ingredients[number:number + 3]
+            ])
+            cls.recipes.append(recipe)
+
+    def setUp(self):
+        self.random = random.Random(1)
+        self.clients = []
+        for user in self.users:
+            client = APIClient()
+            client.force_authenticate(user)
+            self.clients.append(client)
+
+    def toggle_cart(self):
+        number = self.random.randrange(len(self.users))
+        recipe = self.random.choice(self.recipes)
+        url = f'/api/recipes/{recipe.pk}/shopping_cart/'
+        if recipe.in_shopping_carts.filter(
+            user=self.users[number]
+        ).exists():
+            response = self.clients[number].delete(url)
+            self.assertEqual(response.status_code, 204)
+        else:
+            response = self.clients[number].post(url)
+            self.assertEqual(response.status_code, 201)
+
+    def edit_ingredients(self):
+        recipe = self.random.choice(self.recipes)
+        ingredients = self.random.sample(
+            self.ingredients, self.random.randint(1, len(self.ingredients)),
+        )
+        response = self.clients[self.users.index(recipe.author)].patch(
+            f'/api/recipes/{recipe.pk}/',
+            {
+                'ingredients': [
+                    {
+                        'id': ingredient.pk,
+                        'amount': self.random.randint(1, 50),
+                    }
+                    for ingredient in ingredients
+                ],
+                'tags': [self.tag.pk],
+                'name': recipe.name,
+                'text': recipe.text,
+                'cooking_time': recipe.cooking_time,
+            },
+            format='json',
+        )
+        self.assertEqual(response.status_code, 200)
+
+    def test_stored_lists_match_carts(self):
+        user_ids = [user.pk for user in self.users]
+        for step in range(STEPS):
+            if self.random.random() < 0.6:
+                self.toggle_cart()
+            else:
+                self.edit_ingredients()
+            self.assertEqual(
+                get_stored_shopping_lists(user_ids),
+                get_shopping_list_totals(user_ids),
+                f'Шаг {step}',
+            )
@@ -0,0 +1,123 @@
+import csv
+import os
+
+from django.conf import settings
+from django.test import SimpleTestCase, TestCase
+
+from recipes.models import Ingredient
+from recipes.units import (UNIT_ALIASES, IngredientUnits, UnitRegistry,
+                           normalize_unit)
+
+# Единицы, которые приводятся к другой; остальные единицы из
+# data/ingredients.csv остаются сами собой с множителем 1
+CONVERTED_UNITS = {
+    'кг': ('г', 1000),
+    'л': ('мл', 1000),
+}
+
+
+def get_csv_units():
+    path = os.path.join(settings.BASE_DIR, 'data', 'ingredients.csv')
+    with open(path, encoding='utf-8') as file:
+        return sorted(
+            {row['measurement_unit'] for row in csv.DictReader(file)}
+        )
+
+
+class UnitRegistryTest(SimpleTestCase):
+    def setUp(self):
+        self.units = UnitRegistry(UNIT_ALIASES)
+
+    def resolve(self, unit):
+        unit_id, factor = self.units.resolve(unit)
+        return self.units.get_name(unit_id), factor
+
+    def test_csv_units(self):
+        units = get_csv_units()
+        self.assertTrue({'г', 'кг', 'мл', 'л', 'шт.', 'ст. л.', 'ч. л.',
+                         'по вкусу', 'стакан'} <= set(units))
+        for unit in units:
+            with self.subTest(unit=unit):
+                self.assertEqual(
+                    self.resolve(unit), CONVERTED_UNITS.get(unit, (unit, 1)),
+                )
+
+    def test_csv_units_are_distinct(self):
+        names = {self.resolve(unit)[0] for unit in get_csv_units()}
+        self.assertEqual(
+            len(names), len(get_csv_units()) - len(CONVERTED_UNITS),
+        )
+
+    def test_spellings(self):
+        for spelling, expected in (
+            ('гр', ('г', 1)),
+            (' Кг ', ('г', 1000)),
+            ('литр', ('мл', 1000)),
+            ('шт', ('шт.', 1)),
+            ('ст.л.', ('ст. л.', 1)),
+            ('Ст. Л.', ('ст. л.', 1)),
+            ('ч.л', ('ч. л.', 1)),
+        ):
+            with self.subTest(spelling=spelling):
+                self.assertEqual(self.resolve(spelling), expected)
+
+    def test_normalize_unit(self):
+        self.assertEqual(normalize_unit('Ст. Л.'), 'стл')
+        self.assertEqual(normalize_unit('по вкусу'), 'повкусу')
+
+
+class IngredientUnitsTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.ingredients = {
+            (name, unit): Ingredient.objects.create(
+                name=name, measurement_unit=unit,
+            ).pk
+            for name, unit in (
+                ('мука', 'кг'),
+                ('мука', 'г'),
+                ('Молоко', 'л'),
+                ('молоко', 'мл'),
+                ('сахар', 'ст. л.'),
+                ('сахар', 'стакан'),
+                ('сахар', 'ч. л.'),
+                ('яйца', 'шт.'),
+                ('яйца', 'г'),
+                ('соль', 'по вкусу'),
+            )
+        }
+
+    def aggregate(self, amounts):
+        return IngredientUnits(UnitRegistry(UNIT_ALIASES)).aggregate(
+            (self.ingredients[key], amount) for key, amount in amounts
+        )
+
+    def test_mass_and_volume_merge(self):
+        self.assertEqual(self.aggregate([
+            (('мука', 'кг'), 1),
+            (('мука', 'г'), 250),
+            (('мука', 'кг'), 2),
+            (('Молоко', 'л'), 1),
+            (('молоко', 'мл'), 200),
+        ]), [
+            {'name': 'Молоко', 'measurement_unit': 'мл', 'total': 1200},
+            {'name': 'мука', 'measurement_unit': 'г', 'total': 3250},
+        ])
+
+    def test_spoons_glasses_and_pieces_stay_separate(self):
+        self.assertEqual(self.aggregate([
+            (('сахар', 'ст. л.'), 2),
+            (('сахар', 'стакан'), 1),
+            (('сахар', 'ч. л.'), 3),
+            (('сахар', 'ст. л.'), 1),
+            (('яйца', 'шт.'), 2),
+            (('яйца', 'г'), 50),
+            (('соль', 'по вкусу'), 1),
+        ]), [
+            {'name': 'сахар', 'measurement_unit': 'ст. л.', 'total': 3},
+            {'name': 'сахар', 'measurement_unit': 'стакан', 'total': 1},
+            {'name': 'сахар', 'measurement_unit': 'ч. л.', 'total': 3},
+            {'name': 'соль', 'measurement_unit': 'по вкусу', 'total': 1},
+            {'name': 'яйца', 'measurement_unit': 'г', 'total': 50},
+            {'name': 'яйца', 'measurement_unit': 'шт.', 'total': 2},
+        ])
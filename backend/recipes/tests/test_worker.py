@@ -0,0 +1,72 @@
+from io import StringIO
+from unittest import mock
+
+from django.core.management import call_command
+from django.test import TestCase
+
+from recipes.models import Recipe, ShoppingListJob
+from users.models import User
+
+WORKER = 'recipes.management.commands.runworker'
+
+
+def render_cached_pdf(template, context, cache_key):
+    if cache_key == 'bad':
+        raise RuntimeError(cache_key)
+
+
+class WorkerErrorsTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            email='user@example.com',
+            username='user',
+            first_name='Имя',
+            last_name='Фамилия',
+            password='password',
+        )
+
+    def run_worker(self):
+        with self.assertLogs(WORKER, 'ERROR') as logs:
+            call_command('runworker', '--once', stdout=StringIO())
+        return logs.output
+
+    @mock.patch(f'{WORKER}.get_pdf_template', mock.Mock())
+    @mock.patch(f'{WORKER}.render_cached_pdf', render_cached_pdf)
+    def test_failed_job_does_not_stop_queue(self):
+        jobs = {
+            cache_key: ShoppingListJob.objects.create(
+                user=self.user, rows=[], cache_key=cache_key,
+            )
+            for cache_key in ('bad', 'good')
+        }
+        output = self.run_worker()
+        self.assertEqual(len(output), 1)
+        for cache_key, status in (
+            ('bad', ShoppingListJob.Status.FAILED),
+            ('good', ShoppingListJob.Status.DONE),
+        ):
+            job = jobs[cache_key]
+            job.refresh_from_db()
+            self.assertEqual(job.status, status)
+            self.assertIsNotNone(job.finished)
+
+    @mock.patch(
+        f'{WORKER}.process_recipe_image', mock.Mock(side_effect=ValueError),
+    )
+    def test_failed_image_is_not_retried(self):
+        Recipe.objects.bulk_create([
+            Recipe(
+                author=self.user,
+                name=f'Рецепт {number}',
+                text='Описание',
+                cooking_time=10,
+                image='recipes/images/test.jpg',
+            )
+            for number in range(2)
+        ])
+        output = self.run_worker()
+        self.assertEqual(len(output), 2)
+        self.assertFalse(
+            Recipe.objects.filter(image_processed=False).exists()
+        )
@@ -0,0 +1,118 @@
+import re
+import threading
+from collections import defaultdict
+
+from foodgram.caching import get_table_version
+from recipes.models import Ingredient
+
+# Варианты написания единиц: каноническая единица и множитель к ней
+UNIT_ALIASES = {
+    'г': ('г', 1),
+    'гр': ('г', 1),
+    'грамм': ('г', 1),
+    'кг': ('г', 1000),
+    'килограмм': ('г', 1000),
+    'мл': ('мл', 1),
+    'миллилитр': ('мл', 1),
+    'л': ('мл', 1000),
+    'литр': ('мл', 1000),
+    'шт': ('шт.', 1),
+    'штука': ('шт.', 1),
+    'стл': ('ст. л.', 1),
+    'столоваяложка': ('ст. л.', 1),
+    'чл': ('ч. л.', 1),
+    'чайнаяложка': ('ч. л.', 1),
+}
+
+
+def normalize_unit(unit):
+    return re.sub(r'[\s.]', '', unit.lower())
+
+
+class UnitRegistry:
+    def __init__(self, aliases):
+        self.lock = threading.Lock()
+        self.names = []
+        self.ids = {}
+        self.aliases = {}
+        for spelling, (name, factor) in aliases.items():
+            self.aliases[normalize_unit(spelling)] = (self.add(name), factor)
+
+    def add(self, name):
+        unit_id = self.ids.get(name)
+        if unit_id is None:
+            unit_id = self.ids[name] = len(self.names)
+            self.names.append(name)
+        return unit_id
+
+    def resolve(self, unit):
+        key = normalize_unit(unit)
+        resolved = self.aliases.get(key)
+        if resolved is None:
+            with self.lock:
+                resolved = self.aliases.get(key)
+                if resolved is None:
+                    resolved = self.aliases[key] = (
+                        self.add(unit.strip()), 1
+                    )
+        return resolved
+
+    def get_name(self, unit_id):
+        return self.names[unit_id]
+
+
+class IngredientUnits:
+    def __init__(self, units):
+        self.units = units
+        self.lock = threading.Lock()
+        self.entries = {}
+        self.names = {}
+        self.version = None
+
+    def build(self):
+        groups = {}
+        entries = {}
+        names = {}
+        for ingredient_id, name, unit in Ingredient.objects.order_by(
+            'id'
+        ).values_list('id', 'name', 'measurement_unit'):
+            unit_id, factor = self.units.resolve(unit)
+            group = groups.setdefault((name.strip().lower(), unit_id),
+                                      ingredient_id)
+            names.setdefault(group, name)
+            entries[ingredient_id] = (group, unit_id, factor)
+        return entries, names
+
+    def get_entries(self, force=False):
+        version = get_table_version(Ingredient)
+        if force or self.version != version:
+            with self.lock:
+                if force or self.version != version:
+                    self.entries, self.names = self.build()
+                    self.version = version
+        return self.entries, self.names
+
+    def aggregate(self, amounts):
+        amounts = list(amounts)
+        entries, names = self.get_entries()
+        if any(ingredient_id not in entries for ingredient_id, _ in amounts):
+            entries, names = self.get_entries(force=True)
+        totals = defaultdict(int)
+        for ingredient_id, amount in amounts:
+            group, unit_id, factor = entries[ingredient_id]
+            totals[group, unit_id] += amount * factor
+        return sorted(
+            (
+                {
+                    'name': names[group],
+                    'measurement_unit': self.units.get_name(unit_id),
+                    'total': total,
+                }
+                for (group, unit_id), total in totals.items()
+            ),
+            key=lambda row: (row['name'], row['measurement_unit']),
+        )
+
+
+units = UnitRegistry(UNIT_ALIASES)
+ingredient_units = IngredientUnits(units)
@@ -1,6 +1,8 @@
+from django.conf import settings
 from django.urls import include, path
 from rest_framework.routers import DefaultRouter
 
+from .async_views import async_reference_list
 from .views import IngredientViewSet, RecipeViewSet, TagViewSet
 
 router = DefaultRouter()
@@ -10,6 +12,18 @@ router.register('recipes', RecipeViewSet, basename='recipes')
 
 app_name = 'recipes'
 
-urlpatterns = [
+urlpatterns = []
+
+if settings.SERVER_MODE == 'asgi':
+    urlpatterns += [
+        path('tags/', async_reference_list(TagViewSet), name='tags-list'),
+        path(
+            'ingredients/',
+            async_reference_list(IngredientViewSet),
+            name='ingredients-list',
+        ),
+    ]
+
+urlpatterns += [
     path('', include(router.urls)),
 ]
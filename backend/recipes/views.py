@@ -1,41 +1,71 @@
-import os
-
 from django.conf import settings
-from django.db.models import Sum
+from django.db import IntegrityError, transaction
 from django.shortcuts import get_object_or_404
 from django_filters.rest_framework.backends import DjangoFilterBackend
 from rest_framework import permissions, viewsets
 from rest_framework.decorators import action
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
-from rest_framework.status import (HTTP_201_CREATED, HTTP_204_NO_CONTENT,
-                                   HTTP_400_BAD_REQUEST)
+from rest_framework.reverse import reverse
+from rest_framework.status import (HTTP_201_CREATED, HTTP_202_ACCEPTED,
+                                   HTTP_204_NO_CONTENT, HTTP_400_BAD_REQUEST)
 
+from foodgram.caching import TableCacheMixin
 from foodgram.paginations import LimitPageSizePagination
+from recipes.autocomplete import ingredient_index
 from recipes.constants import (FAVORITE_ADD_ERROR, FAVORITE_DELETE_ERROR,
                                SHOPPING_CART_ADD_ERROR,
                                SHOPPING_CART_DELETE_ERROR,
-                               SHOPPING_CART_GET_ERROR)
-from recipes.filters import IngredientSearchFilter, RecipeFilter
-from recipes.models import Favorite, Ingredient, Recipe, ShoppingCart, Tag
-from recipes.pdfrender import render_pdf_view
+                               SHOPPING_CART_FORMAT_ERROR,
+                               SHOPPING_CART_GET_ERROR,
+                               SHOPPING_CART_JOB_ERROR, SHOPPING_CART_TEMPLATE)
+from recipes.filters import (RECIPE_ORDERINGS, IngredientSearchFilter,
+                             RecipeFilter)
+from recipes.models import (Favorite, Ingredient, Recipe, ShoppingCart,
+                            ShoppingListJob, Tag)
+from recipes.pdfrender import (get_cache_key, get_pdf_template, has_cached_pdf,
+                               pdf_response, read_cached_pdf, render_pdf_view)
 from recipes.serializers import (CreateRecipeSerializer, IngredientSerializer,
-                                 RecipeSerializer, TagSerializer)
+                                 RecipeListSerializer, RecipeSerializer,
+                                 RecipeSnapshotSerializer,
+                                 ShoppingListJobSerializer, TagSerializer)
+from recipes.shopping_list import (EXPORT_FORMATS, get_shopping_list,
+                                   stream_shopping_list)
 from users.permissions import IsAdminOrAuthorOrReadOnly
 from users.serializers import LiteRecipeSerializer
 
 
-class TagViewSet(viewsets.ReadOnlyModelViewSet):
+class TagViewSet(TableCacheMixin, viewsets.ReadOnlyModelViewSet):
     queryset = Tag.objects.all()
     serializer_class = TagSerializer
 
 
-class IngredientViewSet(viewsets.ReadOnlyModelViewSet):
+class IngredientViewSet(TableCacheMixin, viewsets.ReadOnlyModelViewSet):
     queryset = Ingredient.objects.all()
     serializer_class = IngredientSerializer
     filter_backends = (DjangoFilterBackend,)
     filterset_class = IngredientSearchFilter
 
+    def get_search_limit(self):
+        try:
+            limit = int(self.request.query_params['limit'])
+        except (KeyError, ValueError):
+            return None
+        return limit if limit > 0 else None
+
+    def search(self, request):
+        name = request.query_params.get('name')
+        limit = self.get_search_limit()
+        if name and settings.INGREDIENT_SEARCH_INDEX:
+            ingredients = ingredient_index.search(name, limit)
+        else:
+            ingredients = self.filter_queryset(self.get_queryset())[:limit]
+        serializer = self.get_serializer(ingredients, many=True)
+        return Response(serializer.data)
+
+    def list(self, request, *args, **kwargs):
+        return self.cached_response(request, lambda: self.search(request))
+
 
 class RecipeViewSet(viewsets.ModelViewSet):
     queryset = Recipe.objects.all()
@@ -44,7 +74,23 @@ class RecipeViewSet(viewsets.ModelViewSet):
     pagination_class = LimitPageSizePagination
     permission_classes = (IsAdminOrAuthorOrReadOnly, )
 
+    @property
+    def cursor_ordering(self):
+        return RECIPE_ORDERINGS.get(
+            self.request.query_params.get('ordering'), ('-pub_date', '-id'),
+        )
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.action != 'retrieve':
+            return queryset
+        return queryset.select_related('author').prefetch_related(
+            *RecipeSnapshotSerializer.get_prefetch()
+        )
+
     def get_serializer_class(self):
+        if self.action == 'list':
+            return RecipeListSerializer
         if self.request.method in permissions.SAFE_METHODS:
             return RecipeSerializer
         return CreateRecipeSerializer
@@ -53,14 +99,15 @@ class RecipeViewSet(viewsets.ModelViewSet):
         serializer.save(author=self.request.user)
 
     def add_to(self, request, pk, model, error):
-        model_object = model.objects.get_or_create(user=request.user)[0]
-        if model_object.recipes.filter(pk__in=pk).exists():
+        recipe = get_object_or_404(Recipe, pk=pk)
+        try:
+            with transaction.atomic():
+                model.objects.create(user=request.user, recipe=recipe)
+        except IntegrityError:
             return Response(
                 {'errors': error},
                 status=HTTP_400_BAD_REQUEST,
             )
-        recipe = get_object_or_404(Recipe, pk=pk)
-        model_object.recipes.add(recipe)
         serializer = LiteRecipeSerializer(recipe)
         return Response(
             serializer.data,
@@ -68,20 +115,15 @@ class RecipeViewSet(viewsets.ModelViewSet):
         )
 
     def delete_from(self, request, pk, model, error):
-        try:
-            model_object = model.objects.get(user=request.user)
-        except model.DoesNotExist:
+        deleted, _ = model.objects.filter(
+            user=request.user,
+            recipe_id=pk,
+        ).delete()
+        if not deleted:
             return Response(
                 {'errors': error},
                 status=HTTP_400_BAD_REQUEST,
             )
-        if not model_object.recipes.filter(pk__in=pk).exists():
-            return Response(
-                {'errors': error},
-                status=HTTP_400_BAD_REQUEST,
-            )
-        recipe = get_object_or_404(Recipe, pk=pk)
-        model_object.recipes.remove(recipe)
         return Response(
             status=HTTP_204_NO_CONTENT,
         )
@@ -106,29 +148,80 @@ class RecipeViewSet(viewsets.ModelViewSet):
             error=FAVORITE_DELETE_ERROR,
         )
 
-    def generate_shopping_ingredients(self, request, shopping_cart):
-        return (
-            shopping_cart.order_by('recipes__ingredients__ingredient__name')
-            .values('recipes__ingredients__ingredient__name',
-                    'recipes__ingredients__ingredient__measurement_unit')
-            .annotate(total=Sum('recipes__ingredients__amount'))
+    def perform_content_negotiation(self, request, force=False):
+        # ?format= выбирает формат списка покупок, а не рендерер DRF
+        if self.action in ('download_shopping_cart', 'shopping_list_job'):
+            force = True
+        return super().perform_content_negotiation(request, force)
+
+    def enqueue_shopping_list(self, request, rows):
+        template = get_pdf_template(SHOPPING_CART_TEMPLATE)
+        cache_key = get_cache_key(template, {'context': rows})
+        job = ShoppingListJob.objects.create(
+            user=request.user,
+            rows=rows,
+            cache_key=cache_key,
+            status=(
+                ShoppingListJob.Status.DONE if has_cached_pdf(cache_key)
+                else ShoppingListJob.Status.PENDING
+            ),
         )
+        return self.shopping_list_job_status(request, job)
 
-    @action(detail=False)
+    def shopping_list_job_status(self, request, job):
+        serializer = ShoppingListJobSerializer(job)
+        location = reverse(
+            'recipes:recipes-shopping-list-job',
+            kwargs={'job_id': job.pk},
+            request=request,
+        )
+        return Response(
+            serializer.data,
+            status=HTTP_202_ACCEPTED,
+            headers={'Location': location},
+        )
+
+    @action(detail=False, permission_classes=(IsAuthenticated,))
     def download_shopping_cart(self, request):
+        export_format = request.query_params.get('format', 'pdf')
+        if export_format != 'pdf' and export_format not in EXPORT_FORMATS:
+            return Response(
+                {'errors': SHOPPING_CART_FORMAT_ERROR},
+                status=HTTP_400_BAD_REQUEST
+            )
         if not ShoppingCart.objects.filter(user=request.user).exists():
             return Response(
                 {'errors': SHOPPING_CART_GET_ERROR},
                 status=HTTP_400_BAD_REQUEST
             )
-        shopping_cart = ShoppingCart.objects.filter(user=request.user)
-        context = {
-            'context': self.generate_shopping_ingredients(request,
-                                                          shopping_cart)
-        }
-        template_path = os.path.join(settings.TEMPLATES_DIR,
-                                     'recipes/shopping_cart.html')
-        return render_pdf_view(request, context, template_path)
+        rows = get_shopping_list(request.user)
+        if export_format in EXPORT_FORMATS:
+            return stream_shopping_list(rows, export_format)
+        if request.query_params.get('async') in ('1', 'true', 'True'):
+            return self.enqueue_shopping_list(request, rows)
+        return render_pdf_view(
+            request, {'context': rows}, SHOPPING_CART_TEMPLATE,
+        )
+
+    @action(
+        detail=False,
+        permission_classes=(IsAuthenticated,),
+        url_path=r'download_shopping_cart/(?P<job_id>[0-9a-f-]{36})',
+    )
+    def shopping_list_job(self, request, job_id=None):
+        job = get_object_or_404(ShoppingListJob, pk=job_id, user=request.user)
+        if job.status == ShoppingListJob.Status.FAILED:
+            return Response(
+                {'errors': SHOPPING_CART_JOB_ERROR},
+                status=HTTP_400_BAD_REQUEST
+            )
+        if job.status == ShoppingListJob.Status.DONE:
+            content = read_cached_pdf(job.cache_key)
+            if content is not None:
+                return pdf_response(content, job.cache_key)
+            job.status = ShoppingListJob.Status.PENDING
+            job.save(update_fields=['status'])
+        return self.shopping_list_job_status(request, job)
 
     @action(
         methods=('post', 'delete'),
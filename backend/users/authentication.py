@@ -0,0 +1,82 @@
+import uuid
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import router
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+
+from foodgram.caching import LocalCache
+
+User = get_user_model()
+
+local_tokens = LocalCache(
+    'AUTH_TOKEN_CACHE_LOCAL_SIZE', 'AUTH_TOKEN_CACHE_LOCAL_TIMEOUT',
+)
+
+
+def get_token_cache_key(key):
+    return f'auth-token:{key}'
+
+
+def get_token_version_key(key):
+    return f'auth-token-version:{key}'
+
+
+def get_cached_fields():
+    # Хэш пароля не кэшируется: он загружается из базы при обращении
+    return [
+        field.attname for field in User._meta.concrete_fields
+        if field.attname != 'password'
+    ]
+
+
+def dump_user(user):
+    return tuple(getattr(user, field) for field in get_cached_fields())
+
+
+def load_user(values):
+    return User.from_db(
+        router.db_for_read(User), get_cached_fields(), values,
+    )
+
+
+def forget_tokens(keys):
+    keys = list(keys)
+    for key in keys:
+        local_tokens.delete(key)
+    cache.delete_many([get_token_cache_key(key) for key in keys])
+    # Запись принимается, только если она сделана при текущей версии
+    # токена. Запрос, прочитавший токен из базы до выхода, сохранит её
+    # со старой версией, поэтому версия хранится дольше любой записи
+    cache.set_many(
+        {get_token_version_key(key): uuid.uuid4().hex for key in keys},
+        settings.AUTH_TOKEN_CACHE_TIMEOUT * 2,
+    )
+
+
+class CachingTokenAuthentication(TokenAuthentication):
+    def authenticate_credentials(self, key):
+        # Кэш в памяти процесса не узнает о выходе в другом процессе
+        if not settings.CACHE_IS_SHARED:
+            return super().authenticate_credentials(key)
+        version_key = get_token_version_key(key)
+        cache_key = get_token_cache_key(key)
+        entry = local_tokens.get(key)
+        if entry is not None:
+            version = cache.get(version_key)
+        else:
+            cached = cache.get_many([version_key, cache_key])
+            version = cached.get(version_key)
+            entry = cached.get(cache_key)
+            if entry is not None and entry[0] == version:
+                local_tokens.set(key, entry)
+        if entry is None or entry[0] != version:
+            user, token = super().authenticate_credentials(key)
+            entry = (version, dump_user(user))
+            cache.set(cache_key, entry, settings.AUTH_TOKEN_CACHE_TIMEOUT)
+            local_tokens.set(key, entry)
+            return user, token
+        user = load_user(entry[1])
+        return user, Token(key=key, user=user)
@@ -0,0 +1,17 @@
+# Generated by Django 4.0.1 on 2026-10-18 04:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='subscription',
+            index=models.Index(fields=['subscriber', 'id'], name='subscription_subscriber_id_idx'),
+        ),
+    ]
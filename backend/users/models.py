@@ -73,6 +73,12 @@ class Subscription(models.Model):
                 name='Уникальная запись подписчик - автор',
             )
         ]
+        indexes = [
+            models.Index(
+                fields=['subscriber', 'id'],
+                name='subscription_subscriber_id_idx',
+            ),
+        ]
 
     def __str__(self):
         return f'{self.subscriber} подписан на {self.subscription}'
@@ -3,8 +3,10 @@ from django.contrib.auth.hashers import make_password
 from django.utils.translation import gettext_lazy as _
 from rest_framework import serializers
 
+from recipes.fields import PreviewImageField
 from recipes.models import Recipe
 from users.models import Subscription
+from users.viewer import Viewer
 
 User = get_user_model()
 
@@ -28,13 +30,7 @@ class UserSerializer(serializers.ModelSerializer):
         }
 
     def get_is_subscribed(self, obj):
-        user = self.context['request'].user
-        if not user.is_authenticated:
-            return False
-        return Subscription.objects.filter(
-            subscriber=user,
-            subscription=obj,
-        ).exists()
+        return obj.pk in Viewer.from_context(self.context).subscription_ids
 
     def create(self, validated_data):
         validated_data['password'] = (
@@ -62,6 +58,7 @@ class SubscribeSerializer(serializers.ModelSerializer):
 
 
 class LiteRecipeSerializer(serializers.ModelSerializer):
+    image = PreviewImageField()
 
     class Meta:
         model = Recipe
@@ -74,9 +71,9 @@ class LiteRecipeSerializer(serializers.ModelSerializer):
 
 
 class SubscriptionSerializer(serializers.ModelSerializer):
-    recipes = LiteRecipeSerializer(many=True)
+    recipes = LiteRecipeSerializer(many=True, source='preview_recipes')
     is_subscribed = serializers.SerializerMethodField(read_only=True)
-    recipes_count = serializers.SerializerMethodField(read_only=True)
+    recipes_count = serializers.IntegerField(read_only=True)
 
     class Meta:
         model = User
@@ -92,11 +89,4 @@ class SubscriptionSerializer(serializers.ModelSerializer):
         ]
 
     def get_is_subscribed(self, obj):
-        user = self.context['request'].user
-        return (
-            user.is_authenticated
-            and obj.subscribers.filter(subscriber=user).exists()
-        )
-
-    def get_recipes_count(self, obj):
-        return obj.recipes.count()
+        return obj.pk in Viewer.from_context(self.context).subscription_ids
@@ -0,0 +1,89 @@
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+from rest_framework.exceptions import AuthenticationFailed
+
+from users.authentication import (CachingTokenAuthentication,
+                                  get_token_cache_key, local_tokens)
+from users.models import User
+
+
+class CachingTokenAuthenticationTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            email='user@example.com',
+            username='user',
+            first_name='Имя',
+            last_name='Фамилия',
+            password='password',
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.token = Token.objects.create(user=self.user)
+        self.key = self.token.key
+        self.addCleanup(local_tokens.delete, self.key)
+        self.authentication = CachingTokenAuthentication()
+
+    def authenticate(self):
+        user, _ = self.authentication.authenticate_credentials(self.key)
+        return user
+
+    @override_settings(CACHE_IS_SHARED=True)
+    def test_cached_token(self):
+        self.assertEqual(self.authenticate(), self.user)
+        with self.assertNumQueries(0):
+            self.assertEqual(self.authenticate(), self.user)
+
+    @override_settings(CACHE_IS_SHARED=True)
+    def test_revoked_in_other_process(self):
+        self.authenticate()
+        # Другой процесс не может сбросить запись в памяти этого процесса
+        with mock.patch.object(local_tokens, 'delete'):
+            self.token.delete()
+        with self.assertRaises(AuthenticationFailed):
+            self.authenticate()
+
+    @override_settings(CACHE_IS_SHARED=True)
+    def test_revoked_during_request(self):
+        authenticate_credentials = TokenAuthentication.authenticate_credentials
+
+        def read_then_logout(authentication, key):
+            result = authenticate_credentials(authentication, key)
+            self.token.delete()
+            return result
+
+        with mock.patch.object(
+            TokenAuthentication, 'authenticate_credentials', read_then_logout,
+        ):
+            self.authenticate()
+        local_tokens.delete(self.key)
+        with self.assertRaises(AuthenticationFailed):
+            self.authenticate()
+
+    @override_settings(CACHE_IS_SHARED=True)
+    def test_cached_again_after_user_change(self):
+        self.authenticate()
+        self.user.first_name = 'Новое имя'
+        self.user.save()
+        self.assertEqual(self.authenticate().first_name, 'Новое имя')
+        with self.assertNumQueries(0):
+            self.assertEqual(self.authenticate().first_name, 'Новое имя')
+
+    @override_settings(CACHE_IS_SHARED=True)
+    def test_password_not_cached(self):
+        self.authenticate()
+        _, values = cache.get(get_token_cache_key(self.key))
+        self.assertNotIn(self.user.password, values)
+        local_tokens.delete(self.key)
+        self.assertTrue(self.authenticate().check_password('password'))
+
+    @override_settings(CACHE_IS_SHARED=False)
+    def test_not_cached_without_shared_cache(self):
+        self.authenticate()
+        with self.assertNumQueries(1):
+            self.authenticate()
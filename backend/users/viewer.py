@@ -0,0 +1,38 @@
+from django.utils.functional import cached_property
+
+from recipes.models import Favorite, ShoppingCart
+from users.models import Subscription
+
+
+class Viewer:
+    def __init__(self, user):
+        self.user = user
+
+    @classmethod
+    def from_context(cls, context):
+        request = context['request']
+        viewer = getattr(request, 'viewer', None)
+        if viewer is None or viewer.user != request.user:
+            viewer = cls(request.user)
+            request.viewer = viewer
+        return viewer
+
+    def get_ids(self, model, user_field, field):
+        if not self.user.is_authenticated:
+            return frozenset()
+        return frozenset(
+            model.objects.filter(**{user_field: self.user})
+            .values_list(field, flat=True)
+        )
+
+    @cached_property
+    def favorite_ids(self):
+        return self.get_ids(Favorite, 'user', 'recipe')
+
+    @cached_property
+    def shopping_cart_ids(self):
+        return self.get_ids(ShoppingCart, 'user', 'recipe')
+
+    @cached_property
+    def subscription_ids(self):
+        return self.get_ids(Subscription, 'subscriber', 'subscription')
@@ -1,4 +1,5 @@
 from django.db import IntegrityError
+from django.db.models import Count, F, OuterRef, Prefetch, Subquery
 from djoser.views import UserViewSet
 from rest_framework.decorators import action
 from rest_framework.permissions import IsAuthenticated
@@ -8,6 +9,7 @@ from rest_framework.status import (HTTP_200_OK, HTTP_201_CREATED,
                                    HTTP_404_NOT_FOUND)
 
 from foodgram.paginations import LimitPageSizePagination
+from recipes.models import Recipe
 from users.models import Subscription, User
 from users.serializers import SubscriptionSerializer
 
@@ -15,15 +17,46 @@ from users.serializers import SubscriptionSerializer
 class SubscriptionViewSet(UserViewSet):
     pagination_class = LimitPageSizePagination
     lookup_url_kwarg = 'user_id'
+    cursor_ordering = ('-pk',)
+
+    def get_recipes_limit(self):
+        try:
+            limit = int(self.request.query_params['recipes_limit'])
+        except (KeyError, ValueError):
+            return None
+        return limit if limit > 0 else None
+
+    def with_recipes(self, queryset):
+        recipes = Recipe.objects.all()
+        limit = self.get_recipes_limit()
+        if limit is not None:
+            recipes = recipes.filter(pk__in=Subquery(
+                Recipe.objects.filter(
+                    author=OuterRef('author'),
+                ).values('pk')[:limit]
+            ))
+        return queryset.annotate(
+            recipes_count=Count('recipes'),
+        ).prefetch_related(
+            Prefetch('recipes', queryset=recipes, to_attr='preview_recipes')
+        )
 
     def get_subscribtion_serializer(self, *args, **kwargs):
         kwargs.setdefault('context', self.get_serializer_context())
         return SubscriptionSerializer(*args, **kwargs)
 
-    @action(detail=False, permission_classes=(IsAuthenticated,))
+    @action(
+        detail=False,
+        permission_classes=(IsAuthenticated,),
+        cursor_ordering=('-subscription_pk',),
+    )
     def subscriptions(self, request):
         self.get_serializer
-        queryset = User.objects.filter(subscribers__subscriber=request.user)
+        queryset = self.with_recipes(User.objects.filter(
+            subscribers__subscriber=request.user,
+        ).annotate(
+            subscription_pk=F('subscribers__id'),
+        )).order_by('-subscription_pk')
         page = self.paginate_queryset(queryset)
         if page is not None:
             serializer = self.get_subscribtion_serializer(page, many=True)
@@ -47,7 +80,11 @@ class SubscriptionViewSet(UserViewSet):
                 {'errors': 'Вы уже подписаны на данного автора'},
                 status=HTTP_400_BAD_REQUEST,
             )
-        serializer = self.get_subscribtion_serializer(subscribe.subscription)
+        serializer = self.get_subscribtion_serializer(
+            self.with_recipes(User.objects.filter(
+                pk=subscribe.subscription_id,
+            )).get()
+        )
         return Response(serializer.data, status=HTTP_201_CREATED)
 
     def delete_subscription(self, request, author):